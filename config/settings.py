@@ -1,6 +1,8 @@
 import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -29,6 +31,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so that session saves are timed too; removes itself unless GAME_PROFILING is enabled
+    "game.profiling.ProfilingMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -62,7 +66,8 @@ WSGI_APPLICATION = "config.wsgi.application"
 # Django REST Framework settings
 REST_FRAMEWORK = {
     "DEFAULT_RENDERER_CLASSES": [
-        "rest_framework.renderers.JSONRenderer",
+        # Same output as rest_framework.renderers.JSONRenderer; uses orjson when installed
+        "game.renderers.GameJSONRenderer",
     ],
     "DEFAULT_PARSER_CLASSES": [
         "rest_framework.parsers.JSONParser",
@@ -81,12 +86,56 @@ CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
 
 # Database
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# SQLite for local development; DATABASE_ENGINE=postgres switches to PostgreSQL
+# configured from the POSTGRES_* environment variables
+DATABASE_ENGINE = os.environ.get("DATABASE_ENGINE", "sqlite")
+
+if DATABASE_ENGINE == "postgres":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ.get("POSTGRES_DB", "simple_game"),
+            "USER": os.environ.get("POSTGRES_USER", "postgres"),
+            "PASSWORD": os.environ.get("POSTGRES_PASSWORD", ""),
+            "HOST": os.environ.get("POSTGRES_HOST", "localhost"),
+            "PORT": os.environ.get("POSTGRES_PORT", "5432"),
+            # Persistent connections: reused between requests of a worker thread
+            "CONN_MAX_AGE": int(os.environ.get("POSTGRES_CONN_MAX_AGE", "60")),
+            # Check a reused connection before the request instead of failing on it
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {},
+        }
     }
-}
+
+    # Django's native pool needs psycopg 3 with the pool extra
+    # (pip install "psycopg[binary,pool]"); psycopg2 does not support it.
+    # The pool replaces persistent connections, so CONN_MAX_AGE must be 0
+    if os.environ.get("POSTGRES_POOL", "") == "1":
+        DATABASES["default"]["CONN_MAX_AGE"] = 0
+        DATABASES["default"]["OPTIONS"]["pool"] = {
+            "min_size": int(os.environ.get("POSTGRES_POOL_MIN_SIZE", "2")),
+            "max_size": int(os.environ.get("POSTGRES_POOL_MAX_SIZE", "10")),
+            "timeout": int(os.environ.get("POSTGRES_POOL_TIMEOUT", "10")),
+        }
+elif DATABASE_ENGINE == "sqlite":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "db.sqlite3",
+            "OPTIONS": {
+                # Transactions take the write lock at BEGIN and wait for it up to
+                # "timeout" seconds; a deferred transaction that reads first fails
+                # at once with "database is locked" when it tries to write
+                "transaction_mode": "IMMEDIATE",
+                "timeout": 20,
+            },
+            # File-backed test database: an in-memory one is shared by all threads,
+            # so concurrency tests would not wait for the write lock
+            "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
+        }
+    }
+else:
+    raise ImproperlyConfigured(f"Unknown DATABASE_ENGINE: {DATABASE_ENGINE}")
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -123,11 +172,54 @@ MEDIA_ROOT = BASE_DIR / "media"
 # Default primary key field type
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Cache configuration
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # With several worker processes switch this to FileBasedCache with a shared LOCATION
+    "sessions": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "game-sessions",
+    },
+}
+
+# Weapon/monster catalog cached in each process (game.content_cache). Edits bump a
+# version key in this cache, which every process compares at most once per check
+# interval; with several worker processes the alias must be shared (FileBasedCache,
+# Redis). Without a shared cache a process still reloads the catalog after MAX_AGE
+GAME_CATALOG_CACHE_ALIAS = "default"
+GAME_CATALOG_CHECK_INTERVAL = 5  # seconds
+GAME_CATALOG_MAX_AGE = 300  # seconds
+
 # Session configuration - CRITICAL FOR YOUR GAME
-SESSION_ENGINE = "django.contrib.sessions.backends.db"
+# Sessions are read from the cache and written to the DB only when data changes
+# or the row expiry is older than GAME_SESSION_WRITE_INTERVAL seconds
+# SESSION_ENGINE=django.contrib.sessions.backends.db restores plain DB sessions (for comparison)
+SESSION_ENGINE = os.environ.get("SESSION_ENGINE", "game.session_backend")
+SESSION_CACHE_ALIAS = "sessions"
 SESSION_COOKIE_AGE = 3600  # 1 hour
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False
 SESSION_SAVE_EVERY_REQUEST = True
+GAME_SESSION_WRITE_INTERVAL = 300  # 5 minutes
+
+# Per-request profiling: timing breakdown (db/engine/serialize/session),
+# rolling percentiles at /metrics/ and cProfile dumps of slow requests
+GAME_PROFILING = {
+    "ENABLED": os.environ.get("GAME_PROFILING", "") == "1",
+    "WINDOW": 1000,  # requests per route used for percentiles
+    "SLOW_MS": int(os.environ.get("GAME_PROFILING_SLOW_MS", "200")),
+    # Directory for .prof dumps of slow requests; profiling every request costs ~2x CPU
+    "PROFILE_DIR": os.environ.get("GAME_PROFILE_DIR") or None,
+    # /metrics/ access. With a token, scrapers send "Authorization: Bearer <token>" and the
+    # client address is ignored. Without one, only METRICS_ALLOWED_IPS may read it; they are
+    # matched against REMOTE_ADDR, which is the proxy's address behind a reverse proxy, so
+    # set a token there instead of allowing the proxy.
+    "METRICS_TOKEN": os.environ.get("GAME_METRICS_TOKEN") or None,
+    "METRICS_ALLOWED_IPS": tuple(
+        os.environ.get("GAME_METRICS_ALLOWED_IPS", "127.0.0.1,::1").split(",")
+    ),
+}
 
 # Security settings for development
 CSRF_COOKIE_SECURE = False
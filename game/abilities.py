@@ -0,0 +1,231 @@
+from django.core.exceptions import ValidationError
+
+from .battle_events import (
+    ACTOR_CHARACTER,
+    ACTOR_MONSTER,
+    EVENT_ACTION_SURGE,
+    EVENT_CRUSHING_WEAKNESS,
+    EVENT_FIRE_BREATH,
+    EVENT_POISON,
+    EVENT_RAGE,
+    EVENT_RAGE_FATIGUE,
+    EVENT_SHIELD,
+    EVENT_SLASHING_IMMUNITY,
+    EVENT_SNEAK_ATTACK,
+    EVENT_STONE_SKIN,
+)
+
+# Реестр способностей.
+#
+# Каждая фабрика получает снимки персонажа и монстра (game.combatants) и
+# возвращает модификатор урона modifier(damage, turn, emit) -> damage либо None,
+# если способность в этом бою никогда не сработает. Набор модификаторов собирается один раз при создании
+# BattleEngine, так что в цикле боя выполняются только подходящие.
+
+# Этапы, на которых применяются модификаторы
+CHARACTER_ATTACK = 'character_attack'
+CHARACTER_DEFENSE = 'character_defense'
+MONSTER_ATTACK = 'monster_attack'
+MONSTER_DEFENSE = 'monster_defense'
+
+
+# Способности персонажа
+
+
+def sneak_attack(character, monster):
+    # Скрытая атака: +1 урон, если персонаж ловчее монстра
+    if character.agility <= monster.agility:
+        return None
+
+    def modifier(damage, turn, emit):
+        emit(ACTOR_CHARACTER, EVENT_SNEAK_ATTACK, 1)
+        return damage + 1
+
+    return modifier
+
+
+def poison(character, monster):
+    # Яд накапливается с каждым ходом
+    def modifier(damage, turn, emit):
+        if turn > 1:
+            emit(ACTOR_CHARACTER, EVENT_POISON, turn - 1)
+            return damage + turn - 1
+        return damage
+
+    return modifier
+
+
+def action_surge(character, monster):
+    # Порыв к действию: урон оружия ещё раз на первом ходу
+    weapon_damage = character.weapon_damage
+
+    def modifier(damage, turn, emit):
+        if turn == 1:
+            emit(ACTOR_CHARACTER, EVENT_ACTION_SURGE, weapon_damage)
+            return damage + weapon_damage
+        return damage
+
+    return modifier
+
+
+def rage(character, monster):
+    # Ярость: первые 3 хода +2, потом -1
+    def modifier(damage, turn, emit):
+        if turn <= 3:
+            emit(ACTOR_CHARACTER, EVENT_RAGE, 2)
+            return damage + 2
+        emit(ACTOR_CHARACTER, EVENT_RAGE_FATIGUE, 1)
+        return damage - 1
+
+    return modifier
+
+
+def shield(character, monster):
+    # Щит: -3 урона, если персонаж сильнее монстра
+    if character.strength <= monster.strength:
+        return None
+
+    def modifier(damage, turn, emit):
+        emit(ACTOR_CHARACTER, EVENT_SHIELD, 3)
+        return damage - 3
+
+    return modifier
+
+
+def stone_skin(character, monster):
+    # Каменная кожа: урон снижается на выносливость
+    endurance = character.endurance
+
+    def modifier(damage, turn, emit):
+        emit(ACTOR_CHARACTER, EVENT_STONE_SKIN, endurance)
+        return damage - endurance
+
+    return modifier
+
+
+# (уровень класса, минимальный уровень, этап, фабрика) — в порядке применения
+CHARACTER_ABILITIES = [
+    ('rogue_level', 1, CHARACTER_ATTACK, sneak_attack),
+    ('rogue_level', 3, CHARACTER_ATTACK, poison),
+    ('warrior_level', 1, CHARACTER_ATTACK, action_surge),
+    ('barbarian_level', 1, CHARACTER_ATTACK, rage),
+    ('warrior_level', 2, CHARACTER_DEFENSE, shield),
+    ('barbarian_level', 2, CHARACTER_DEFENSE, stone_skin),
+]
+
+
+# Способности монстров
+
+
+def monster_sneak_attack(character, monster):
+    # Скрытая атака как у разбойника
+    if monster.agility <= character.agility:
+        return None
+
+    def modifier(damage, turn, emit):
+        emit(ACTOR_MONSTER, EVENT_SNEAK_ATTACK, 1)
+        return damage + 1
+
+    return modifier
+
+
+def fire_breath(character, monster):
+    # Дыхание огнем каждый 3-й ход
+    def modifier(damage, turn, emit):
+        if turn % 3 == 0:
+            emit(ACTOR_MONSTER, EVENT_FIRE_BREATH, 3)
+            return damage + 3
+        return damage
+
+    return modifier
+
+
+def crushing_weakness(character, monster):
+    # Двойной урон от дробящего оружия
+    if character.weapon_type != 'crushing':
+        return None
+
+    def modifier(damage, turn, emit):
+        emit(ACTOR_MONSTER, EVENT_CRUSHING_WEAKNESS)
+        return damage * 2
+
+    return modifier
+
+
+def slashing_immunity(character, monster):
+    # Рубящее оружие не наносит урона (кроме бонусов)
+    if character.weapon_type != 'slashing':
+        return None
+    weapon_damage = character.weapon_damage
+
+    def modifier(damage, turn, emit):
+        emit(ACTOR_MONSTER, EVENT_SLASHING_IMMUNITY)
+        return damage - weapon_damage
+
+    return modifier
+
+
+def monster_stone_skin(character, monster):
+    # Каменная кожа как у варвара
+    endurance = monster.endurance
+
+    def modifier(damage, turn, emit):
+        emit(ACTOR_MONSTER, EVENT_STONE_SKIN, endurance)
+        return damage - endurance
+
+    return modifier
+
+
+# Ключ способности (поле Monster.abilities) -> (этап, фабрика) — в порядке
+# применения. Порядок ключей в Monster.abilities на бой не влияет: защита
+# монстра всегда считается как x2, затем минус оружие, затем минус выносливость
+# (так же, как в game.battle_simulator)
+MONSTER_ABILITIES = {
+    'sneak_attack': (MONSTER_ATTACK, monster_sneak_attack),
+    'fire_breath': (MONSTER_ATTACK, fire_breath),
+    'crushing_weakness': (MONSTER_DEFENSE, crushing_weakness),
+    'slashing_immunity': (MONSTER_DEFENSE, slashing_immunity),
+    'stone_skin': (MONSTER_DEFENSE, monster_stone_skin),
+}
+
+
+def parse_ability_keys(value):
+    return [key.strip() for key in value.split(',') if key.strip()]
+
+
+def validate_monster_abilities(value):
+    keys = parse_ability_keys(value)
+    unknown = [key for key in keys if key not in MONSTER_ABILITIES]
+    if unknown:
+        raise ValidationError(f"Неизвестные способности: {', '.join(unknown)}")
+    duplicates = sorted({key for key in keys if keys.count(key) > 1})
+    if duplicates:
+        raise ValidationError(f"Повторяющиеся способности: {', '.join(duplicates)}")
+
+
+def resolve_abilities(character, monster):
+    """Собирает модификаторы урона для снимков персонажа и монстра по этапам."""
+    stages = {
+        CHARACTER_ATTACK: [],
+        CHARACTER_DEFENSE: [],
+        MONSTER_ATTACK: [],
+        MONSTER_DEFENSE: [],
+    }
+
+    for level_field, min_level, stage, factory in CHARACTER_ABILITIES:
+        if getattr(character, level_field) >= min_level:
+            modifier = factory(character, monster)
+            if modifier is not None:
+                stages[stage].append(modifier)
+
+    keys = set(monster.abilities)
+    unknown = sorted(keys - MONSTER_ABILITIES.keys())
+    if unknown:
+        raise ValueError(f"Unknown monster ability: {', '.join(unknown)}")
+    for key, (stage, factory) in MONSTER_ABILITIES.items():
+        if key in keys:
+            modifier = factory(character, monster)
+            if modifier is not None:
+                stages[stage].append(modifier)
+
+    return stages
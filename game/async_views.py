@@ -0,0 +1,205 @@
+import json
+import random
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, transaction
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from . import content_cache
+from .battle_events import RECORD_EVENTS, RECORD_MODES, RECORD_TEXT, render_log
+from .battles import aget_session_character, aplay_battle, get_session_character
+from .etags import asession_character_etag, character_etag, not_modified, set_etag
+from .matchups import apredict
+from .models import Character, GameSession, Weapon
+from .payloads import character_payload, monster_payload, weapon_payload
+from .renderers import GameJSONRenderer
+
+# Асинхронные версии API для запуска под ASGI (uvicorn, daphne): чтение идет
+# через async ORM, расчет боя — в пуле потоков, так что ожидание БД не держит
+# поток на каждый запрос. Ответы совпадают с game.views.
+#
+# Как и DRF-view (SessionAuthentication без входа в систему), они не требуют
+# CSRF-токена.
+
+
+def api_response(data, status=200):
+    # Тот же рендерер, что у DRF-представлений: тело ответа совпадает побайтно
+    return HttpResponse(
+        GameJSONRenderer().render(data), status=status, content_type='application/json'
+    )
+
+
+def request_data(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+@csrf_exempt
+@require_POST
+async def create_character(request):
+    data = request_data(request)
+    if data is None:
+        return api_response({'error': 'Invalid JSON'}, status=400)
+
+    # Получаем начальное оружие
+    character_class = data.get('class')
+    weapon_name = settings.RPG_GAME_SETTINGS['DEFAULT_WEAPONS'].get(character_class)
+    if weapon_name is None:
+        return api_response({'error': 'Unknown class'}, status=400)
+    catalog = await content_cache.aget_catalog()
+    initial_weapon = content_cache.get_weapon_by_name(weapon_name, catalog)
+
+    session_key = request.session.session_key
+    if not session_key:
+        await request.session.acreate()
+        session_key = request.session.session_key
+
+    # Удаляем старую сессию если есть и создаем новую
+    await GameSession.objects.filter(session_key=session_key).adelete()
+    game_session = await GameSession.objects.acreate(session_key=session_key)
+
+    strength = random.randint(1, 3)
+    agility = random.randint(1, 3)
+    endurance = random.randint(1, 3)
+
+    # Как в game.views.create_character: здоровье считается до назначения класса
+    character = await Character.objects.acreate(
+        game_session=game_session,
+        strength=strength,
+        agility=agility,
+        endurance=endurance,
+        current_weapon=initial_weapon,
+    )
+    setattr(character, f'{character_class}_level', 1)
+    await character.asave(update_fields=[f'{character_class}_level'])
+
+    return api_response(
+        {
+            'character': character_payload(character),
+            'stats': {'strength': strength, 'agility': agility, 'endurance': endurance},
+        }
+    )
+
+
+@require_GET
+async def get_character(request):
+    session_key = request.session.session_key
+    if not session_key:
+        return api_response({'error': 'No active session'}, status=400)
+
+    if 'If-None-Match' in request.headers:
+        response = not_modified(request, await asession_character_etag(session_key))
+        if response is not None:
+            return response
+
+    try:
+        character = await aget_session_character(session_key)
+    except Character.DoesNotExist:
+        return api_response({'error': 'Character not found'}, status=404)
+    catalog = await content_cache.aget_catalog()
+    return set_etag(
+        api_response(character_payload(character)),
+        character_etag(character.id, character.version, catalog),
+    )
+
+
+@csrf_exempt
+@require_POST
+async def start_battle(request):
+    session_key = request.session.session_key
+    if not session_key:
+        return api_response({'error': 'No active session'}, status=400)
+
+    data = request_data(request)
+    if data is None:
+        return api_response({'error': 'Invalid JSON'}, status=400)
+    log_mode = data.get('log', RECORD_TEXT)
+    if log_mode not in RECORD_MODES:
+        return api_response({'error': 'Unknown log mode'}, status=400)
+
+    try:
+        character, monster, battle_result, events = await aplay_battle(session_key)
+    except Character.DoesNotExist:
+        return api_response({'error': 'Character not found'}, status=404)
+    except (IntegrityError, OperationalError):
+        return api_response({'error': 'Battle conflict, try again'}, status=409)
+
+    if log_mode == RECORD_TEXT:
+        battle_result['log'] = json.dumps(render_log(events, monster.name), ensure_ascii=False)
+    elif log_mode == RECORD_EVENTS:
+        battle_result['events'] = events
+
+    return api_response(
+        {
+            'battle_result': battle_result,
+            'prediction': await apredict(character, monster),
+            'monster': monster_payload(monster),
+            'character': character_payload(character),
+        }
+    )
+
+
+@sync_to_async
+def level_up(session_key, character_class):
+    # Проверка total_level и запись под блокировкой строки: транзакции в async ORM нет
+    with transaction.atomic():
+        character = get_session_character(session_key, lock=True)
+        return character, character.level_up_class(character_class)
+
+
+@csrf_exempt
+@require_POST
+async def level_up_character(request):
+    data = request_data(request)
+    if data is None:
+        return api_response({'error': 'Invalid JSON'}, status=400)
+    character_class = data.get('class')
+
+    try:
+        character, success = await level_up(request.session.session_key, character_class)
+    except Character.DoesNotExist:
+        return api_response({'error': 'Character not found'}, status=404)
+
+    if not success:
+        return api_response({'error': 'Максимальный уровень достигнут'}, status=400)
+    return api_response(
+        {
+            'character': character_payload(character),
+            'message': f'Уровень {character_class} повышен!',
+        }
+    )
+
+
+@csrf_exempt
+@require_POST
+async def change_weapon(request):
+    data = request_data(request)
+    if data is None:
+        return api_response({'error': 'Invalid JSON'}, status=400)
+
+    try:
+        character = await aget_session_character(request.session.session_key)
+        catalog = await content_cache.aget_catalog()
+        weapon = content_cache.get_weapon(data.get('weapon_id'), catalog)
+    except Character.DoesNotExist:
+        return api_response({'error': 'Character not found'}, status=404)
+    except Weapon.DoesNotExist:
+        return api_response({'error': 'Weapon not found'}, status=404)
+
+    old_weapon = character.current_weapon
+    character.current_weapon = weapon
+    await character.asave_changes(['current_weapon'])
+
+    return api_response(
+        {
+            'character': character_payload(character),
+            'old_weapon': weapon_payload(old_weapon),
+            'new_weapon': weapon_payload(weapon),
+        }
+    )
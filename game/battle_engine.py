@@ -1,204 +1,309 @@
 import json
 import random
+from collections.abc import Iterable
+
+from django.conf import settings
+
+from .abilities import (
+    CHARACTER_ATTACK,
+    CHARACTER_DEFENSE,
+    MONSTER_ATTACK,
+    MONSTER_DEFENSE,
+    resolve_abilities,
+)
+from .battle_events import (
+    ACTOR_CHARACTER,
+    ACTOR_MONSTER,
+    EVENT_ABSORBED,
+    EVENT_ATTACK,
+    EVENT_DEFEAT,
+    EVENT_DRAW,
+    EVENT_HIT,
+    EVENT_MISS,
+    EVENT_START,
+    EVENT_VICTORY,
+    RECORD_EVENTS,
+    RECORD_MODES,
+    RECORD_NONE,
+    RECORD_TEXT,
+    render_log,
+)
+
+
+def make_roller(rng=None):
+    """
+    Возвращает функцию roll(n) -> случайное целое от 1 до n.
+
+    rng может быть None (глобальный модуль random), random.Random,
+    numpy.random.Generator или последовательностью заранее выброшенных
+    чисел из [0, 1). Другие генераторы не принимаются: у numpy.random.RandomState
+    и модуля numpy.random тоже есть randint, но с исключенной верхней границей,
+    и с ними n не выпадало бы никогда.
+    """
+    if rng is None or rng is random:
+        return lambda n: random.randint(1, n)
+    if isinstance(rng, random.Random):
+        randint = rng.randint
+        return lambda n: randint(1, n)
+    if hasattr(rng, 'integers'):
+        integers = rng.integers
+        return lambda n: int(integers(1, n + 1))
+    if isinstance(rng, Iterable):
+        rolls = iter(rng)
+        return lambda n: int(next(rolls) * n) + 1
+    raise TypeError(f"Unsupported random number generator: {type(rng).__name__}")
+
+
+# Лимит ходов, если Django не настроен (симуляции в отдельных процессах)
+MAX_TURNS = 50
+
+
+def default_max_turns():
+    if not settings.configured:
+        return MAX_TURNS
+    return settings.RPG_GAME_SETTINGS['MAX_BATTLE_TURNS']
+
+
+# Правило ранней ничьей, общее для BattleEngine и game.battle_simulator.
+# Первые три хода особые (порыв к действию, ярость). Дальше урон либо
+# повторяется с периодом 3 (огненное дыхание), либо растет с каждым ходом (яд).
+# Бой может идти без урона до лимита, только если никто не наносит урона ни в
+# ходах 4–9, ни в последнем ходе: яд, который когда-нибудь пробьет защиту, к
+# последнему ходу ее уже пробивает. Тогда бой заканчивается ничьей после
+# последнего из первых трех ходов, в котором урон еще возможен.
+OPENING_TURNS = range(1, 4)
+
+
+def stall_check_turns(max_turns):
+    return (*range(4, 10), max_turns)
 
 
 class BattleEngine:
-    def __init__(self, character, monster):
+    """
+    Бой персонажа с монстром.
+
+    character и monster — снимки game.combatants.CharacterStats и MonsterStats
+    (from_model() строит их из моделей), а не модели Django.
+    """
+
+    def __init__(self, character, monster, record=RECORD_TEXT, rng=None, max_turns=None):
+        if record not in RECORD_MODES:
+            raise ValueError(f"Unknown record mode: {record}")
+
         self.character = character
         self.monster = monster
         self.character_hp = character.current_health
         self.monster_hp = monster.health
         self.turn_counter = 0
-        self.battle_log = []
-
-    def fight(self):
+        self.roll = make_roller(rng)
+        self.record = record
+        # В режиме RECORD_NONE события не накапливаются вовсе
+        self.events = None if record == RECORD_NONE else []
+
+        # Базовый урон, ловкость и способности вычисляются один раз на бой
+        self.character_agility = character.agility
+        self.monster_agility = monster.agility
+        self.character_base_damage = character.weapon_damage + character.strength
+        self.monster_base_damage = monster.weapon_damage + monster.strength
+        abilities = resolve_abilities(character, monster)
+        self.character_abilities = abilities[CHARACTER_ATTACK]
+        self.character_defense = abilities[CHARACTER_DEFENSE]
+        self.monster_abilities = abilities[MONSTER_ATTACK]
+        self.monster_defense = abilities[MONSTER_DEFENSE]
+
+        # Верхняя граница длины боя: лимит ходов из настроек, а если урон
+        # после первых трех ходов невозможен ни для кого вплоть до лимита —
+        # последний ход, в котором урон еще возможен. Дальше бой заканчивается ничьей.
+        if max_turns is None:
+            max_turns = default_max_turns()
+        self.last_turn = max_turns
+        if self.can_stall(max_turns):
+            self.last_turn = min(max_turns, self.last_damaging_turn())
+
+    def first_attacker(self):
         # Определяем кто ходит первым
         if self.character.agility > self.monster.agility:
-            first_attacker = 'character'
+            return 'character'
         elif self.character.agility < self.monster.agility:
-            first_attacker = 'monster'
-        else:
-            first_attacker = 'character'  # При равной ловкости персонаж ходит первым
-
-        self.log(
-            f"Бой начинается! {self.character_hp} HP vs {self.monster.name} {self.monster_hp} HP"
-        )
+            return 'monster'
+        return 'character'  # При равной ловкости персонаж ходит первым
 
-        current_attacker = first_attacker
-
-        while self.character_hp > 0 and self.monster_hp > 0:
-            self.turn_counter += 1
-
-            if current_attacker == 'character':
-                self.character_attack()
-                current_attacker = 'monster'
-            else:
-                self.monster_attack()
-                current_attacker = 'character'
-
-        # Определяем победителя
-        if self.character_hp > 0:
+    def fight(self):
+        current_attacker = self.begin()
+        last_turn = self.last_turn
+
+        while self.character_hp > 0 and self.monster_hp > 0 and self.turn_counter < last_turn:
+            current_attacker = self.play_turn(current_attacker)
+
+        return self.finish()
+
+    def iter_fight(self):
+        """
+        Бой по ходам: после начала боя, каждого хода и итога отдает новые события.
+
+        Результат, как у fight(), — значение StopIteration (result = yield from ...).
+        В режиме RECORD_NONE отдаются пустые списки.
+        """
+        current_attacker = self.begin()
+        sent = 0
+        events = self.events or []
+        yield events[sent:]
+        sent = len(events)
+        last_turn = self.last_turn
+
+        while self.character_hp > 0 and self.monster_hp > 0 and self.turn_counter < last_turn:
+            current_attacker = self.play_turn(current_attacker)
+            yield events[sent:]
+            sent = len(events)
+
+        result = self.finish()
+        yield events[sent:]
+        return result
+
+    def begin(self):
+        # Начало боя; возвращает того, кто атакует первым
+        self.emit(ACTOR_CHARACTER, EVENT_START, self.character_hp)
+        self.emit(ACTOR_MONSTER, EVENT_START, self.monster_hp)
+        return self.first_attacker()
+
+    def play_turn(self, attacker):
+        # Один ход боя, общий для fight() и iter_fight(); возвращает следующего атакующего
+        self.turn_counter += 1
+        if attacker == 'character':
+            self.character_attack()
+            return 'monster'
+        self.monster_attack()
+        return 'character'
+
+    def finish(self):
+        # Определяем победителя; бой, остановленный по лимиту ходов, — ничья
+        if self.character_hp <= 0:
+            winner = 'monster'
+            self.emit(ACTOR_CHARACTER, EVENT_DEFEAT)
+        elif self.monster_hp <= 0:
             winner = 'character'
-            self.log("🎉 Персонаж победил!")
+            self.emit(ACTOR_CHARACTER, EVENT_VICTORY)
         else:
-            winner = 'monster'
-            self.log("💀 Персонаж погиб...")
+            winner = 'draw'
+            self.emit(ACTOR_CHARACTER, EVENT_DRAW)
 
-        return {
+        result = {
             'winner': winner,
             'character_hp': max(0, self.character_hp),
             'monster_hp': max(0, self.monster_hp),
-            'log': json.dumps(self.battle_log, ensure_ascii=False),
         }
+        if self.record == RECORD_EVENTS:
+            result['events'] = self.events
+        elif self.record == RECORD_TEXT:
+            result['events'] = self.events
+            result['log'] = json.dumps(
+                render_log(self.events, self.monster.name), ensure_ascii=False
+            )
+        return result
 
     def character_attack(self):
-        self.log(f"Ход {self.turn_counter}: Персонаж атакует!")
+        self.emit(ACTOR_CHARACTER, EVENT_ATTACK)
 
         # Проверяем попадание
-        if not self.check_hit(self.character.agility, self.monster.agility):
-            self.log("❌ Промах!")
+        if not self.check_hit(self.character_agility, self.monster_agility):
+            self.emit(ACTOR_CHARACTER, EVENT_MISS)
             return
 
-        # Базовый урон
-        base_damage = self.character.current_weapon.damage + self.character.strength
-
         # Применяем способности персонажа
-        damage = self.apply_character_abilities(base_damage)
+        damage = self.apply_character_abilities(self.character_base_damage)
 
         # Применяем защитные способности монстра
         final_damage = self.apply_monster_defense(damage)
 
         if final_damage > 0:
             self.monster_hp -= final_damage
-            self.log(
-                f"💥 Нанесено {final_damage} урона! У {self.monster.name} осталось {max(0, self.monster_hp)} HP"
-            )
+            self.emit(ACTOR_CHARACTER, EVENT_HIT, final_damage)
         else:
-            self.log("🛡️ Урон полностью поглощен!")
+            self.emit(ACTOR_CHARACTER, EVENT_ABSORBED)
 
     def monster_attack(self):
-        self.log(f"Ход {self.turn_counter}: {self.monster.name} атакует!")
+        self.emit(ACTOR_MONSTER, EVENT_ATTACK)
 
         # Проверяем попадание
-        if not self.check_hit(self.monster.agility, self.character.agility):
-            self.log("❌ Промах!")
+        if not self.check_hit(self.monster_agility, self.character_agility):
+            self.emit(ACTOR_MONSTER, EVENT_MISS)
             return
 
-        # Базовый урон монстра
-        base_damage = self.monster.weapon_damage + self.monster.strength
-
         # Применяем способности монстра
-        damage = self.apply_monster_abilities(base_damage)
+        damage = self.apply_monster_abilities(self.monster_base_damage)
 
         # Применяем защитные способности персонажа
         final_damage = self.apply_character_defense(damage)
 
         if final_damage > 0:
             self.character_hp -= final_damage
-            self.log(f"💥 Получено {final_damage} урона! Осталось {max(0, self.character_hp)} HP")
+            self.emit(ACTOR_MONSTER, EVENT_HIT, final_damage)
         else:
-            self.log("🛡️ Урон полностью поглощен!")
+            self.emit(ACTOR_MONSTER, EVENT_ABSORBED)
 
     def check_hit(self, attacker_agility, target_agility):
         total_agility = attacker_agility + target_agility
-        roll = random.randint(1, total_agility)
+        roll = self.roll(total_agility)
         return roll > target_agility
 
     def apply_character_abilities(self, base_damage):
         damage = base_damage
-
-        # Способности разбойника
-        if self.character.rogue_level >= 1:
-            # Скрытая атака
-            if self.character.agility > self.monster.agility:
-                damage += 1
-                self.log("🗡️ Скрытая атака! +1 урон")
-
-            # Яд (с 3 уровня)
-            if self.character.rogue_level >= 3:
-                poison_damage = self.turn_counter - 1  # Яд накапливается с каждым ходом
-                if poison_damage > 0:
-                    damage += poison_damage
-                    self.log(f"☠️ Яд! +{poison_damage} урон")
-
-        # Способности воина
-        if self.character.warrior_level >= 1:
-            # Порыв к действию (первый ход)
-            if self.turn_counter == 1:
-                weapon_damage = self.character.current_weapon.damage
-                damage += weapon_damage
-                self.log(f"⚡ Порыв к действию! +{weapon_damage} урон")
-
-        # Способности варвара
-        if self.character.barbarian_level >= 1:
-            # Ярость (первые 3 хода +2, потом -1)
-            if self.turn_counter <= 3:
-                damage += 2
-                self.log("🔥 Ярость! +2 урон")
-            else:
-                damage -= 1
-                self.log("😤 Усталость от ярости! -1 урон")
-
+        for modifier in self.character_abilities:
+            damage = modifier(damage, self.turn_counter, self.emit)
         return max(0, damage)
 
     def apply_character_defense(self, incoming_damage):
         damage = incoming_damage
-
-        # Способности воина
-        if self.character.warrior_level >= 2:
-            # Щит
-            if self.character.strength > self.monster.strength:
-                damage -= 3
-                self.log("🛡️ Щит! -3 урон")
-
-        # Способности варвара
-        if self.character.barbarian_level >= 2:
-            # Каменная кожа
-            damage -= self.character.endurance
-            self.log(f"🗿 Каменная кожа! -{self.character.endurance} урон")
-
+        for modifier in self.character_defense:
+            damage = modifier(damage, self.turn_counter, self.emit)
         return max(0, damage)
 
     def apply_monster_abilities(self, base_damage):
         damage = base_damage
-
-        # Особые способности монстров
-        if self.monster.name == "Призрак":
-            # Скрытая атака как у разбойника
-            if self.monster.agility > self.character.agility:
-                damage += 1
-                self.log("👻 Призрак использует скрытую атаку! +1 урон")
-
-        elif self.monster.name == "Дракон":
-            # Дыхание огнем каждый 3-й ход
-            if self.turn_counter % 3 == 0:
-                damage += 3
-                self.log("🔥 Дракон дышит огнем! +3 урон")
-
+        for modifier in self.monster_abilities:
+            damage = modifier(damage, self.turn_counter, self.emit)
         return damage
 
     def apply_monster_defense(self, incoming_damage):
         damage = incoming_damage
+        for modifier in self.monster_defense:
+            damage = modifier(damage, self.turn_counter, self.emit)
+        return max(0, damage)
 
-        if self.monster.name == "Скелет":
-            # Двойной урон от дробящего оружия
-            if self.character.current_weapon.weapon_type == 'crushing':
-                damage *= 2
-                self.log("💀 Скелет уязвим к дробящему! Урон удвоен")
-
-        elif self.monster.name == "Слайм":
-            # Рубящее оружие не наносит урона (кроме бонусов)
-            if self.character.current_weapon.weapon_type == 'slashing':
-                weapon_damage = self.character.current_weapon.damage
-                damage -= weapon_damage
-                self.log("🟢 Слайм невосприимчив к рубящему оружию!")
-
-        elif self.monster.name == "Голем":
-            # Каменная кожа как у варвара
-            damage -= self.monster.endurance
-            self.log(f"🗿 Голем использует каменную кожу! -{self.monster.endurance} урон")
+    def hit_damage(self, attacker, turn):
+        # Урон при попадании в ход turn, без записи событий
+        turn_counter, events = self.turn_counter, self.events
+        self.turn_counter, self.events = turn, None
+        try:
+            if attacker == 'character':
+                damage = self.apply_character_abilities(self.character_base_damage)
+                return self.apply_monster_defense(damage)
+            damage = self.apply_monster_abilities(self.monster_base_damage)
+            return self.apply_character_defense(damage)
+        finally:
+            self.turn_counter, self.events = turn_counter, events
+
+    def can_stall(self, max_turns):
+        # Урона нет ни у кого после первых ходов (см. stall_check_turns)
+        return all(
+            self.hit_damage(attacker, turn) == 0
+            for turn in stall_check_turns(max_turns)
+            for attacker in ('character', 'monster')
+        )
 
-        return max(0, damage)
+    def attacker_on(self, turn):
+        first = self.first_attacker()
+        if turn % 2 == 1:
+            return first
+        return 'monster' if first == 'character' else 'character'
+
+    def last_damaging_turn(self):
+        # Последний из первых трех ходов, в котором попадание наносит урон (0 — ни одного)
+        return max(
+            (turn for turn in OPENING_TURNS if self.hit_damage(self.attacker_on(turn), turn) > 0),
+            default=0,
+        )
 
-    def log(self, message):
-        self.battle_log.append(message)
+    def emit(self, actor, code, value=0):
+        if self.events is not None:
+            self.events.append((self.turn_counter, actor, code, value))
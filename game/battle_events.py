@@ -0,0 +1,131 @@
+import struct
+import zlib
+
+# Компактная запись хода боя: событие — кортеж (ход, актор, код, значение).
+# Текст лога строится из событий только по запросу (render_log).
+
+# Режимы записи лога
+RECORD_NONE = 'none'
+RECORD_EVENTS = 'events'
+RECORD_TEXT = 'text'
+RECORD_MODES = (RECORD_NONE, RECORD_EVENTS, RECORD_TEXT)
+
+# Акторы
+ACTOR_CHARACTER = 0
+ACTOR_MONSTER = 1
+
+# Коды событий
+EVENT_START = 0
+EVENT_ATTACK = 1
+EVENT_MISS = 2
+EVENT_HIT = 3
+EVENT_ABSORBED = 4
+EVENT_SNEAK_ATTACK = 5
+EVENT_POISON = 6
+EVENT_ACTION_SURGE = 7
+EVENT_RAGE = 8
+EVENT_RAGE_FATIGUE = 9
+EVENT_SHIELD = 10
+EVENT_STONE_SKIN = 11
+EVENT_FIRE_BREATH = 12
+EVENT_CRUSHING_WEAKNESS = 13
+EVENT_SLASHING_IMMUNITY = 14
+EVENT_VICTORY = 15
+EVENT_DEFEAT = 16
+EVENT_DRAW = 17
+
+# Шаблоны сообщений: {name} — имя монстра, {value} — числовое значение события
+MESSAGES = {
+    (ACTOR_CHARACTER, EVENT_ATTACK): 'Ход {turn}: Персонаж атакует!',
+    (ACTOR_MONSTER, EVENT_ATTACK): 'Ход {turn}: {name} атакует!',
+    (ACTOR_CHARACTER, EVENT_MISS): '❌ Промах!',
+    (ACTOR_MONSTER, EVENT_MISS): '❌ Промах!',
+    (ACTOR_CHARACTER, EVENT_ABSORBED): '🛡️ Урон полностью поглощен!',
+    (ACTOR_MONSTER, EVENT_ABSORBED): '🛡️ Урон полностью поглощен!',
+    (ACTOR_CHARACTER, EVENT_SNEAK_ATTACK): '🗡️ Скрытая атака! +{value} урон',
+    (ACTOR_CHARACTER, EVENT_POISON): '☠️ Яд! +{value} урон',
+    (ACTOR_CHARACTER, EVENT_ACTION_SURGE): '⚡ Порыв к действию! +{value} урон',
+    (ACTOR_CHARACTER, EVENT_RAGE): '🔥 Ярость! +{value} урон',
+    (ACTOR_CHARACTER, EVENT_RAGE_FATIGUE): '😤 Усталость от ярости! -{value} урон',
+    (ACTOR_CHARACTER, EVENT_SHIELD): '🛡️ Щит! -{value} урон',
+    (ACTOR_CHARACTER, EVENT_STONE_SKIN): '🗿 Каменная кожа! -{value} урон',
+    (ACTOR_MONSTER, EVENT_SNEAK_ATTACK): '👻 {name} использует скрытую атаку! +{value} урон',
+    (ACTOR_MONSTER, EVENT_FIRE_BREATH): '🔥 {name} дышит огнем! +{value} урон',
+    (ACTOR_MONSTER, EVENT_CRUSHING_WEAKNESS): '💀 {name} уязвим к дробящему! Урон удвоен',
+    (ACTOR_MONSTER, EVENT_SLASHING_IMMUNITY): '🟢 {name} невосприимчив к рубящему оружию!',
+    (ACTOR_MONSTER, EVENT_STONE_SKIN): '🗿 {name} использует каменную кожу! -{value} урон',
+    (ACTOR_CHARACTER, EVENT_VICTORY): '🎉 Персонаж победил!',
+    (ACTOR_CHARACTER, EVENT_DEFEAT): '💀 Персонаж погиб...',
+    (ACTOR_CHARACTER, EVENT_DRAW): '⏱️ Ничья! Бой остановлен после хода {turn}',
+}
+
+
+# Двоичный формат: байт заголовка и записи фиксированной длины
+# (ход uint16, актор uint8, код uint8, значение int16)
+EVENT_RECORD = struct.Struct('<HBBh')
+FORMAT_RAW = 0
+FORMAT_ZLIB = 1
+
+
+def encode_events(events, compress=True):
+    raw = b''.join(EVENT_RECORD.pack(*event) for event in events)
+    if compress:
+        packed = zlib.compress(raw)
+        # Сжатие имеет смысл только если оно действительно уменьшает размер
+        if len(packed) < len(raw):
+            return bytes([FORMAT_ZLIB]) + packed
+    return bytes([FORMAT_RAW]) + raw
+
+
+def decode_events(blob):
+    blob = bytes(blob)
+    if not blob:
+        return []
+    data = blob[1:]
+    if blob[0] == FORMAT_ZLIB:
+        data = zlib.decompress(data)
+    return list(EVENT_RECORD.iter_unpack(data))
+
+
+class LogRenderer:
+    """Строит текст лога по частям: HP между вызовами render() сохраняется."""
+
+    def __init__(self, monster_name):
+        self.monster_name = monster_name
+        self.character_hp = 0
+        self.monster_hp = 0
+
+    def render(self, events):
+        monster_name = self.monster_name
+        lines = []
+
+        for turn, actor, code, value in events:
+            if code == EVENT_START:
+                if actor == ACTOR_CHARACTER:
+                    self.character_hp = value
+                else:
+                    self.monster_hp = value
+                    lines.append(
+                        f"Бой начинается! {self.character_hp} HP vs {monster_name} {self.monster_hp} HP"
+                    )
+            elif code == EVENT_HIT:
+                if actor == ACTOR_CHARACTER:
+                    self.monster_hp -= value
+                    lines.append(
+                        f"💥 Нанесено {value} урона! У {monster_name} осталось {max(0, self.monster_hp)} HP"
+                    )
+                else:
+                    self.character_hp -= value
+                    lines.append(
+                        f"💥 Получено {value} урона! Осталось {max(0, self.character_hp)} HP"
+                    )
+            else:
+                template = MESSAGES[(actor, code)]
+                lines.append(template.format(turn=turn, name=monster_name, value=value))
+
+        return lines
+
+
+def render_log(events, monster_name):
+    # Восстанавливаем HP по ходу боя, чтобы вывести остаток после каждого удара
+    return LogRenderer(monster_name).render(events)
@@ -0,0 +1,118 @@
+from functools import lru_cache
+
+from .battle_engine import BattleEngine, default_max_turns
+from .battle_events import RECORD_NONE
+from .combatants import CharacterStats, MonsterStats
+
+# Точный расчет исхода боя без симуляции.
+#
+# Урон в каждом ходе детерминирован, случайно только попадание, поэтому бой —
+# конечная марковская цепь по состояниям (ход, HP персонажа, HP монстра).
+# Распределение вероятностей по состояниям продвигается ход за ходом, пока
+# живых состояний не останется (или их суммарная вероятность не станет
+# пренебрежимо малой). Как и в BattleEngine, бой длиннее лимита ходов
+# (или бой без возможного урона после первых ходов) — ничья.
+
+EPSILON = 1e-12
+
+
+def matchup_key(character, monster):
+    # Снимки без имени монстра: исход зависит только от характеристик
+    return (
+        CharacterStats.from_model(character),
+        MonsterStats.from_model(monster)._replace(name=''),
+    )
+
+
+@lru_cache(maxsize=4096)
+def _solve(key, max_turns):
+    character, monster = key
+    engine = BattleEngine(character, monster, record=RECORD_NONE, max_turns=max_turns)
+
+    # Вероятность попадания: randint(1, a + b) > b  =>  a / (a + b)
+    character_hit = character.agility / (character.agility + monster.agility)
+    monster_hit = monster.agility / (character.agility + monster.agility)
+    character_first = character.agility >= monster.agility
+
+    win = loss = 0.0
+    expected_turns = 0.0
+    expected_damage = 0.0
+
+    states = {}
+    if character.current_health > 0 and monster.health > 0:
+        states[(character.current_health, monster.health)] = 1.0
+    elif character.current_health > 0:
+        win = 1.0
+    else:
+        loss = 1.0
+
+    turn = 0
+    while states and turn < engine.last_turn:
+        turn += 1
+        character_turn = character_first == (turn % 2 == 1)
+        hit_chance = character_hit if character_turn else monster_hit
+        damage = engine.hit_damage('character' if character_turn else 'monster', turn)
+
+        next_states = {}
+        for (character_hp, monster_hp), p in states.items():
+            miss = p * (1 - hit_chance)
+            if damage == 0:
+                next_states[(character_hp, monster_hp)] = (
+                    next_states.get((character_hp, monster_hp), 0.0) + p
+                )
+                continue
+            if miss:
+                next_states[(character_hp, monster_hp)] = (
+                    next_states.get((character_hp, monster_hp), 0.0) + miss
+                )
+
+            hit = p * hit_chance
+            if character_turn:
+                monster_hp -= damage
+            else:
+                character_hp -= damage
+
+            if monster_hp <= 0:
+                win += hit
+                expected_turns += hit * turn
+                expected_damage += hit * (character.current_health - character_hp)
+            elif character_hp <= 0:
+                loss += hit
+                expected_turns += hit * turn
+                expected_damage += hit * character.current_health
+            else:
+                next_states[(character_hp, monster_hp)] = (
+                    next_states.get((character_hp, monster_hp), 0.0) + hit
+                )
+
+        states = next_states
+        if sum(states.values()) < EPSILON:
+            break
+
+    # Бои, не закончившиеся к последнему ходу, считаются ничьей
+    draw = sum(states.values())
+    expected_turns += draw * turn
+    expected_damage += sum(
+        p * (character.current_health - character_hp) for (character_hp, _), p in states.items()
+    )
+
+    return {
+        'win': win,
+        'loss': loss,
+        'draw': draw,
+        'expected_turns': expected_turns,
+        'expected_damage_taken': expected_damage,
+    }
+
+
+def battle_odds(character, monster, max_turns=None):
+    """Точные вероятности исходов, ожидаемая длина боя и ожидаемый урон по персонажу."""
+    return dict(_solve(matchup_key(character, monster), max_turns or default_max_turns()))
+
+
+def win_probability(character, monster, max_turns=None):
+    return _solve(matchup_key(character, monster), max_turns or default_max_turns())['win']
+
+
+def clear_cache():
+    _solve.cache_clear()
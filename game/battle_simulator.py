@@ -0,0 +1,228 @@
+import numpy as np
+
+from .abilities import MONSTER_ABILITIES
+from .battle_engine import OPENING_TURNS, default_max_turns, stall_check_turns
+
+# Пакетная симуляция боёв: N боёв разрешаются одновременно на массивах NumPy
+# по тем же правилам, что и BattleEngine.fight().
+
+CHARACTER_FIELDS = (
+    'strength',
+    'agility',
+    'endurance',
+    'rogue_level',
+    'warrior_level',
+    'barbarian_level',
+    'health',
+    'weapon_damage',
+    'weapon_type',
+)
+
+MONSTER_FIELDS = (
+    'health',
+    'weapon_damage',
+    'strength',
+    'agility',
+    'endurance',
+    # Флаги способностей (0/1) по ключам game.abilities.MONSTER_ABILITIES
+    *MONSTER_ABILITIES,
+)
+
+WEAPON_TYPE_CODES = {'slashing': 0, 'crushing': 1, 'piercing': 2}
+
+# Исходы боя
+OUTCOME_DRAW = -1
+OUTCOME_MONSTER = 0
+OUTCOME_CHARACTER = 1
+
+
+# Векторы строятся из снимков game.combatants (CharacterStats, MonsterStats),
+# как и BattleEngine: модели Django переводятся в снимки через from_model()
+
+
+def character_vectors(characters):
+    characters = list(characters)
+    return {
+        'strength': [c.strength for c in characters],
+        'agility': [c.agility for c in characters],
+        'endurance': [c.endurance for c in characters],
+        'rogue_level': [c.rogue_level for c in characters],
+        'warrior_level': [c.warrior_level for c in characters],
+        'barbarian_level': [c.barbarian_level for c in characters],
+        'health': [c.current_health for c in characters],
+        'weapon_damage': [c.weapon_damage for c in characters],
+        'weapon_type': [WEAPON_TYPE_CODES[c.weapon_type] for c in characters],
+    }
+
+
+def monster_vectors(monsters):
+    monsters = list(monsters)
+    vectors = {
+        'health': [m.health for m in monsters],
+        'weapon_damage': [m.weapon_damage for m in monsters],
+        'strength': [m.strength for m in monsters],
+        'agility': [m.agility for m in monsters],
+        'endurance': [m.endurance for m in monsters],
+    }
+    abilities = [set(m.abilities) for m in monsters]
+    for key in MONSTER_ABILITIES:
+        vectors[key] = [int(key in keys) for keys in abilities]
+    return vectors
+
+
+def _broadcast(character, monster):
+    # Скаляры и массивы длины 1 растягиваются до общего размера пакета
+    names = [('c', f) for f in CHARACTER_FIELDS] + [('m', f) for f in MONSTER_FIELDS]
+    arrays = [np.asarray(character[f], dtype=np.int64) for f in CHARACTER_FIELDS]
+    arrays += [np.asarray(monster[f], dtype=np.int64) for f in MONSTER_FIELDS]
+    arrays = np.broadcast_arrays(*arrays)
+    columns = {name: np.atleast_1d(a).copy() for name, a in zip(names, arrays)}
+    return {f: columns[('c', f)] for f in CHARACTER_FIELDS}, {
+        f: columns[('m', f)] for f in MONSTER_FIELDS
+    }
+
+
+def _character_damage(c, m, turn):
+    # Урон персонажа в ход turn до броска на попадание (как в apply_character_abilities)
+    damage = c['weapon_damage'] + c['strength']
+
+    rogue = c['rogue_level'] >= 1
+    damage = damage + (rogue & (c['agility'] > m['agility']))
+    if turn > 1:
+        damage = damage + np.where(c['rogue_level'] >= 3, turn - 1, 0)
+
+    if turn == 1:
+        damage = damage + np.where(c['warrior_level'] >= 1, c['weapon_damage'], 0)
+
+    rage = 2 if turn <= 3 else -1
+    damage = damage + np.where(c['barbarian_level'] >= 1, rage, 0)
+    damage = np.maximum(damage, 0)
+
+    # Защита монстра (как в apply_monster_defense)
+    weapon_type = c['weapon_type']
+    damage = np.where(
+        (m['crushing_weakness'] == 1) & (weapon_type == WEAPON_TYPE_CODES['crushing']),
+        damage * 2,
+        damage,
+    )
+    damage = np.where(
+        (m['slashing_immunity'] == 1) & (weapon_type == WEAPON_TYPE_CODES['slashing']),
+        damage - c['weapon_damage'],
+        damage,
+    )
+    damage = damage - m['stone_skin'] * m['endurance']
+    return np.maximum(damage, 0)
+
+
+def _monster_damage(c, m, turn):
+    # Урон монстра в ход turn (как в apply_monster_abilities)
+    damage = m['weapon_damage'] + m['strength']
+    damage = damage + ((m['sneak_attack'] == 1) & (m['agility'] > c['agility']))
+    if turn % 3 == 0:
+        damage = damage + m['fire_breath'] * 3
+
+    # Защита персонажа (как в apply_character_defense)
+    damage = damage - np.where((c['warrior_level'] >= 2) & (c['strength'] > m['strength']), 3, 0)
+    damage = damage - np.where(c['barbarian_level'] >= 2, c['endurance'], 0)
+    return np.maximum(damage, 0)
+
+
+def _take(columns, idx):
+    return {f: a[idx] for f, a in columns.items()}
+
+
+def _last_turns(c, m, character_first, max_turns):
+    # Последний ход каждого боя по правилу ранней ничьей BattleEngine
+    # (can_stall() и last_damaging_turn())
+    stalled = np.ones(len(c['health']), dtype=bool)
+    for turn in stall_check_turns(max_turns):
+        stalled &= (_character_damage(c, m, turn) == 0) & (_monster_damage(c, m, turn) == 0)
+
+    last_damaging = np.zeros(len(c['health']), dtype=np.int64)
+    for turn in OPENING_TURNS:
+        character_turn = character_first == (turn % 2 == 1)
+        damage = np.where(
+            character_turn, _character_damage(c, m, turn), _monster_damage(c, m, turn)
+        )
+        last_damaging = np.where(damage > 0, turn, last_damaging)
+    return np.where(stalled, np.minimum(max_turns, last_damaging), max_turns)
+
+
+def simulate_batch(character, monster, rng=None, max_turns=None):
+    """
+    Разрешает N боёв одновременно.
+
+    character и monster — словари полей CHARACTER_FIELDS / MONSTER_FIELDS,
+    значения — скаляры или массивы длины N. Бои, не закончившиеся за
+    max_turns ходов (по умолчанию MAX_BATTLE_TURNS), считаются ничьей; бои,
+    в которых урон после первых ходов невозможен, заканчиваются ничьей раньше,
+    как в BattleEngine.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    if max_turns is None:
+        max_turns = default_max_turns()
+    c, m = _broadcast(character, monster)
+    n = len(c['health'])
+
+    character_hp = c['health'].copy()
+    monster_hp = m['health'].copy()
+    turns = np.zeros(n, dtype=np.int64)
+    # При равной ловкости персонаж ходит первым
+    character_first = c['agility'] >= m['agility']
+    last_turn = _last_turns(c, m, character_first, max_turns)
+
+    active = np.flatnonzero((character_hp > 0) & (monster_hp > 0) & (last_turn > 0))
+    turn = 0
+    while active.size and turn < max_turns:
+        turn += 1
+        turns[active] = turn
+
+        character_turn = character_first[active] == (turn % 2 == 1)
+        attackers = active[character_turn]
+        defenders = active[~character_turn]
+
+        if attackers.size:
+            ac, am = _take(c, attackers), _take(m, attackers)
+            roll = rng.integers(1, ac['agility'] + am['agility'] + 1)
+            hit = roll > am['agility']
+            damage = _character_damage(ac, am, turn)
+            monster_hp[attackers] -= np.where(hit, damage, 0)
+
+        if defenders.size:
+            dc, dm = _take(c, defenders), _take(m, defenders)
+            roll = rng.integers(1, dm['agility'] + dc['agility'] + 1)
+            hit = roll > dc['agility']
+            damage = _monster_damage(dc, dm, turn)
+            character_hp[defenders] -= np.where(hit, damage, 0)
+
+        active = active[
+            (character_hp[active] > 0) & (monster_hp[active] > 0) & (last_turn[active] > turn)
+        ]
+
+    # Как в BattleEngine.finish(): ничья — оба живы после последнего хода
+    outcome = np.where(
+        character_hp <= 0,
+        OUTCOME_MONSTER,
+        np.where(monster_hp <= 0, OUTCOME_CHARACTER, OUTCOME_DRAW),
+    )
+    character_hp = np.maximum(character_hp, 0)
+    monster_hp = np.maximum(monster_hp, 0)
+
+    wins = int(np.count_nonzero(outcome == OUTCOME_CHARACTER))
+    draws = int(np.count_nonzero(outcome == OUTCOME_DRAW))
+    return {
+        'fights': n,
+        'wins': wins,
+        'losses': n - wins - draws,
+        'draws': draws,
+        'win_rate': wins / n if n else 0.0,
+        'outcome': outcome,
+        'turns': turns,
+        'character_hp': character_hp,
+        'monster_hp': monster_hp,
+        # Распределения: индекс — число ходов / остаток HP, значение — число боёв
+        'turns_histogram': np.bincount(turns),
+        'character_hp_histogram': np.bincount(character_hp),
+        'monster_hp_histogram': np.bincount(monster_hp),
+    }
@@ -0,0 +1,186 @@
+import asyncio
+import random
+import secrets
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from . import content_cache, profiling
+from .battle_engine import BattleEngine
+from .battle_events import RECORD_EVENTS, encode_events
+from .combatants import CharacterStats
+from .models import BattleLog, Character
+
+
+def get_session_character(session_key, lock=False):
+    # Персонаж вместе с оружием одним запросом через ключ сессии
+    queryset = Character.objects.select_related('current_weapon')
+    if lock:
+        # Блокируется только строка персонажа (SQLite select_for_update игнорирует)
+        queryset = queryset.select_for_update(of=('self',))
+    return queryset.get(game_session__session_key=session_key)
+
+
+async def aget_session_character(session_key):
+    return await Character.objects.select_related('current_weapon').aget(
+        game_session__session_key=session_key
+    )
+
+
+def new_battle_engine(character, monster, seed, record=RECORD_EVENTS, catalog=None):
+    # Движок получает снимки: поля моделей читаются один раз до начала боя
+    return BattleEngine(
+        CharacterStats.from_model(character),
+        content_cache.get_monster_stats(monster, catalog),
+        record=record,
+        rng=random.Random(seed),
+    )
+
+
+def fight(character, monster, seed, catalog=None):
+    # Чистый расчет боя без обращений к БД: можно выполнять в отдельном потоке
+    # (с переданным каталогом)
+    with profiling.section(profiling.ENGINE):
+        battle_result = new_battle_engine(character, monster, seed, catalog=catalog).fight()
+    events = battle_result.pop('events')
+    return battle_result, events
+
+
+def record_battle(character, monster, seed, battle_state, battle_result, events):
+    """
+    Сохраняет лог боя и прогресс персонажа в одной транзакции.
+
+    Обновляет в character счетчики, записанные в БД.
+    """
+    with transaction.atomic():
+        # Счетчик боев увеличивается первым запросом: UPDATE блокирует строку
+        # персонажа (в SQLite — всю БД на запись), поэтому параллельные бои
+        # одной сессии записываются по очереди и номера боев не повторяются
+        characters = Character.objects.filter(pk=character.pk)
+        if not characters.update(battles_fought=F('battles_fought') + 1, version=F('version') + 1):
+            raise Character.DoesNotExist('Character not found')
+
+        if battle_result['winner'] == 'character':
+            characters.update(
+                monsters_defeated=F('monsters_defeated') + 1,
+                current_health=F('max_health'),  # Восстанавливаем здоровье
+            )
+        (
+            character.battles_fought,
+            character.monsters_defeated,
+            character.current_health,
+            character.version,
+        ) = characters.values_list(
+            'battles_fought', 'monsters_defeated', 'current_health', 'version'
+        ).get()
+
+        # Сохраняем лог боя в компактном виде (только события)
+        BattleLog.objects.create(
+            game_session_id=character.game_session_id,
+            monster=monster,
+            battle_number=character.battles_fought,
+            events=encode_events(events),
+            winner=battle_result['winner'],
+            seed=seed,
+            character_state=battle_state,
+        )
+
+
+def prepare_battle(session_key, monster=None):
+    # Персонаж, противник, зерно ГСЧ и снимок персонажа для воспроизведения боя
+    character = get_session_character(session_key)
+    if monster is None:
+        monster = content_cache.random_monster()
+
+    # Собственный ГСЧ на каждый бой: зерно сохраняется, бой можно воспроизвести
+    seed = secrets.randbits(63)
+    return character, monster, seed, character.get_battle_state()
+
+
+def play_battle(session_key, monster=None):
+    """
+    Проводит бой персонажа сессии и сохраняет результат.
+
+    Возвращает (character, monster, battle_result, events).
+    """
+    character, monster, seed, battle_state = prepare_battle(session_key, monster)
+    battle_result, events = fight(character, monster, seed)
+    record_battle(character, monster, seed, battle_state, battle_result, events)
+    return character, monster, battle_result, events
+
+
+def auto_run(session_key, level_up_order=(), take_reward=False, max_battles=None):
+    """
+    Играет серию боев подряд в одной транзакции, как игрок между боями.
+
+    После каждой победы берет оружие-награду (если take_reward) и повышает
+    следующий уровень из level_up_order, пока total_level позволяет. Серия
+    заканчивается поражением, победой в игре (MONSTERS_TO_WIN) или после
+    max_battles боев; ничья не прерывает серию.
+
+    Возвращает (character, outcome, battles), где battles — список
+    (monster, battle_result, events, changes).
+    """
+    monsters_to_win = settings.RPG_GAME_SETTINGS['MONSTERS_TO_WIN']
+    if max_battles is None:
+        max_battles = monsters_to_win
+    level_ups = list(level_up_order)
+
+    battles = []
+    outcome = 'stopped'
+    with transaction.atomic():
+        character = get_session_character(session_key, lock=True)
+
+        while len(battles) < max_battles:
+            if character.monsters_defeated >= monsters_to_win:
+                outcome = 'won_game'
+                break
+
+            monster = content_cache.random_monster()
+            seed = secrets.randbits(63)
+            battle_state = character.get_battle_state()
+            battle_result, events = fight(character, monster, seed)
+            record_battle(character, monster, seed, battle_state, battle_result, events)
+
+            changes = {}
+            battles.append((monster, battle_result, events, changes))
+            if battle_result['winner'] == 'monster':
+                outcome = 'defeated'
+                break
+            if battle_result['winner'] == 'draw':
+                # Ничья ничего не меняет: следующий бой с другим монстром
+                continue
+
+            if take_reward and monster.reward_weapon_id != character.current_weapon_id:
+                character.current_weapon = monster.reward_weapon
+                character.save_changes(['current_weapon'])
+                changes['weapon'] = monster.reward_weapon.name
+            while level_ups and character.total_level < 3:
+                character_class = level_ups.pop(0)
+                if character.level_up_class(character_class):
+                    changes['level_up'] = character_class
+                    break
+        else:
+            if character.monsters_defeated >= monsters_to_win:
+                outcome = 'won_game'
+
+    return character, outcome, battles
+
+
+async def aplay_battle(session_key):
+    """Асинхронный play_battle: расчет боя уходит в пул потоков, чтение — в async ORM."""
+    character = await aget_session_character(session_key)
+    catalog = await content_cache.aget_catalog()
+    monster = content_cache.random_monster(catalog=catalog)
+
+    seed = secrets.randbits(63)
+    battle_state = character.get_battle_state()
+    # to_thread копирует контекст: время боя попадает в профиль запроса
+    battle_result, events = await asyncio.to_thread(fight, character, monster, seed, catalog)
+    # transaction.atomic() пока не поддерживает async: запись идет через sync_to_async
+    await sync_to_async(record_battle)(
+        character, monster, seed, battle_state, battle_result, events
+    )
+    return character, monster, battle_result, events
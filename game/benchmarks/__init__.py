@@ -0,0 +1,62 @@
+import atexit
+import io
+import os
+import shutil
+import tempfile
+import time
+
+import django
+
+
+def setup(sqlite_file=False):
+    # Настраивает Django и создает тестовую БД с игровыми данными; при выходе
+    # из процесса БД удаляется
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    django.setup()
+
+    from django.core.management import call_command
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    if connection.vendor == 'sqlite':
+        # Своя БД на каждый запуск, а не TEST NAME из настроек: файл от прошлого
+        # (или параллельного) прогона не мешает. Тестовая SQLite в памяти не ждет
+        # блокировку, а сразу падает: для параллельных клиентов берем файл,
+        # как в настоящем развертывании
+        name = ':memory:'
+        if sqlite_file:
+            directory = tempfile.mkdtemp()
+            atexit.register(shutil.rmtree, directory, ignore_errors=True)
+            name = os.path.join(directory, 'benchmark.sqlite3')
+        connection.settings_dict['TEST']['NAME'] = name
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    atexit.register(connection.creation.destroy_test_db, old_name, verbosity=0)
+    call_command('init_game_data', stdout=io.StringIO())
+
+
+def timed(func, repeat):
+    # Возвращает лучшее время из нескольких прогонов, в секундах
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def latency_report(latencies, elapsed):
+    # Пропускная способность и перцентили задержки одной строкой
+    latencies = sorted(latencies)
+
+    def percentile(q):
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+
+    return (
+        f'{len(latencies) / elapsed:.0f} запр/с, '
+        f'p50 {percentile(0.5):.1f} мс, p95 {percentile(0.95):.1f} мс, '
+        f'p99 {percentile(0.99):.1f} мс, среднее {sum(latencies) / len(latencies) * 1000:.1f} мс'
+    )
@@ -0,0 +1,89 @@
+import argparse
+import asyncio
+import threading
+import time
+
+from game.benchmarks import latency_report, setup
+
+# Синхронные DRF-view через WSGI-обработчик (поток на клиента) против
+# асинхронных view через ASGI-обработчик (корутина на клиента).
+# Запуск: python -m game.benchmarks.asgi --clients 16
+#
+# Оба пути обслуживаются в этом процессе тестовыми клиентами Django, без
+# сетевого сервера; на uvicorn порядок будет тем же, меньше накладные расходы.
+
+
+def wsgi_client(prefix, battles, latencies):
+    from django.db import connection
+    from django.test import Client
+
+    client = Client()
+    client.post(f'{prefix}character/create/', {'class': 'warrior'}, content_type='application/json')
+    for _ in range(battles):
+        start = time.perf_counter()
+        response = client.post(
+            f'{prefix}battle/start/', {'log': 'none'}, content_type='application/json'
+        )
+        latencies.append((time.perf_counter() - start, response.status_code))
+    connection.close()
+
+
+async def asgi_client(prefix, battles, latencies):
+    from django.test import AsyncClient
+
+    client = AsyncClient()
+    await client.post(
+        f'{prefix}character/create/', {'class': 'warrior'}, content_type='application/json'
+    )
+    for _ in range(battles):
+        start = time.perf_counter()
+        response = await client.post(
+            f'{prefix}battle/start/', {'log': 'none'}, content_type='application/json'
+        )
+        latencies.append((time.perf_counter() - start, response.status_code))
+
+
+def run_wsgi(clients, battles):
+    latencies = []
+    threads = [
+        threading.Thread(target=wsgi_client, args=('/api/', battles, latencies))
+        for _ in range(clients)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, time.perf_counter() - start
+
+
+def run_asgi(clients, battles):
+    latencies = []
+
+    async def main():
+        await asyncio.gather(
+            *(asgi_client('/api/async/', battles, latencies) for _ in range(clients))
+        )
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    return latencies, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=8, help='Параллельных клиентов')
+    parser.add_argument('--battles', type=int, default=100, help='Боев на клиента')
+    args = parser.parse_args()
+
+    setup(sqlite_file=True)
+
+    for name, run in (('WSGI, sync', run_wsgi), ('ASGI, async', run_asgi)):
+        results, elapsed = run(args.clients, args.battles)
+        errors = sum(status != 200 for _, status in results)
+        latencies = [latency for latency, _ in results]
+        print(f'{name:<12} {latency_report(latencies, elapsed)}, ошибок: {errors}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import threading
+import time
+
+from game.benchmarks import latency_report, setup
+
+# Пропускная способность и задержки POST /api/battle/start/ на текущей БД.
+# Сравнение бэкендов — два запуска с разным окружением:
+#   python -m game.benchmarks.battle_endpoint --clients 8
+#   DATABASE_ENGINE=postgres POSTGRES_PASSWORD=... python -m game.benchmarks.battle_endpoint --clients 8
+# Для PostgreSQL подойдет контейнер:
+#   docker run --rm -e POSTGRES_PASSWORD=game -p 5432:5432 postgres:16
+
+
+def run_client(battles, results):
+    from django.db import connection
+    from django.test import Client
+
+    client = Client()
+    client.post('/api/character/create/', {'class': 'warrior'}, content_type='application/json')
+
+    latencies = []
+    statuses = {}
+    for _ in range(battles):
+        start = time.perf_counter()
+        response = client.post(
+            '/api/battle/start/', {'log': 'none'}, content_type='application/json'
+        )
+        latencies.append(time.perf_counter() - start)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    # У каждого потока свое соединение с БД
+    connection.close()
+    results.append((latencies, statuses))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=4, help='Параллельных клиентов (потоков)')
+    parser.add_argument('--battles', type=int, default=200, help='Боев на клиента')
+    args = parser.parse_args()
+
+    setup(sqlite_file=True)
+
+    from django.db import connection
+
+    database = connection.settings_dict
+
+    results = []
+    threads = [
+        threading.Thread(target=run_client, args=(args.battles, results))
+        for _ in range(args.clients)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for client_latencies, _ in results for latency in client_latencies]
+    statuses = {}
+    for _, client_statuses in results:
+        for status, count in client_statuses.items():
+            statuses[status] = statuses.get(status, 0) + count
+
+    print(
+        f"БД: {database['ENGINE'].rsplit('.', 1)[-1]}, CONN_MAX_AGE={database.get('CONN_MAX_AGE', 0)}, "
+        f"пул: {'да' if 'pool' in database.get('OPTIONS', {}) else 'нет'}"
+    )
+    print(f'Клиентов: {args.clients}, запросов: {len(latencies)}, статусы: {statuses}')
+    print(latency_report(latencies, elapsed))
+
+
+if __name__ == '__main__':
+    main()
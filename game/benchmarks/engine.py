@@ -0,0 +1,82 @@
+import argparse
+import random
+
+from game.benchmarks import setup, timed
+
+# Стоимость хода BattleEngine (реестр способностей) против прежней
+# диспетчеризации по имени монстра. Запуск: python -m game.benchmarks.engine
+
+# Сборки персонажей: (сила, ловкость, выносливость, разбойник, воин, варвар, оружие)
+BUILDS = {
+    'rogue': (2, 3, 2, 3, 0, 0, 'Кинжал'),
+    'warrior': (3, 2, 2, 0, 3, 0, 'Меч'),
+    'barbarian': (3, 2, 2, 0, 0, 3, 'Дубина'),
+    'mixed': (2, 2, 2, 1, 1, 1, 'Копье'),
+}
+
+
+def make_character(build):
+    from game.models import Character, Weapon
+
+    strength, agility, endurance, rogue, warrior, barbarian, weapon = build
+    character = Character(
+        strength=strength,
+        agility=agility,
+        endurance=endurance,
+        rogue_level=rogue,
+        warrior_level=warrior,
+        barbarian_level=barbarian,
+        total_level=rogue + warrior + barbarian,
+        current_weapon=Weapon.objects.get(name=weapon),
+    )
+    character.max_health = character.current_health = character.calculate_max_health()
+    return character
+
+
+def run_fights(engine_class, pairs, fights, seed):
+    rng = random.Random(seed)
+    turns = 0
+    for character, monster in pairs:
+        for _ in range(fights):
+            engine = engine_class(character, monster, record='none', rng=rng)
+            engine.fight()
+            turns += engine.turn_counter
+    return turns
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fights', type=int, default=2000, help='Боев на пару персонаж/монстр')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    setup()
+
+    from game.battle_engine import BattleEngine
+    from game.benchmarks.legacy_engine import LegacyBattleEngine
+    from game.combatants import CharacterStats, MonsterStats
+    from game.models import Monster
+
+    monsters = list(Monster.objects.all())
+    characters = [make_character(build) for build in BUILDS.values()]
+    pairs = [(character, monster) for character in characters for monster in monsters]
+    # Прежний движок читает модели, текущий — снимки game.combatants
+    snapshots = [
+        (CharacterStats.from_model(character), MonsterStats.from_model(monster))
+        for character, monster in pairs
+    ]
+
+    print(f"{'движок':<12}{'ходов':>10}{'время, с':>12}{'нс/ход':>10}")
+    for name, engine_class, engine_pairs in (
+        ('legacy', LegacyBattleEngine, pairs),
+        ('registry', BattleEngine, snapshots),
+    ):
+        turns = run_fights(engine_class, engine_pairs, args.fights, seed=0)
+        elapsed = timed(
+            lambda: run_fights(engine_class, engine_pairs, args.fights, seed=0), args.repeat
+        )
+        print(f"{name:<12}{turns:>10}{elapsed:>12.3f}{elapsed / turns * 1e9:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+from game.battle_engine import BattleEngine, make_roller
+from game.battle_events import (
+    ACTOR_CHARACTER,
+    ACTOR_MONSTER,
+    EVENT_ACTION_SURGE,
+    EVENT_CRUSHING_WEAKNESS,
+    EVENT_FIRE_BREATH,
+    EVENT_POISON,
+    EVENT_RAGE,
+    EVENT_RAGE_FATIGUE,
+    EVENT_SHIELD,
+    EVENT_SLASHING_IMMUNITY,
+    EVENT_SNEAK_ATTACK,
+    EVENT_STONE_SKIN,
+    RECORD_NONE,
+)
+
+
+class LegacyBattleEngine(BattleEngine):
+    # Прежняя диспетчеризация способностей по имени монстра и уровням классов
+    # на каждой атаке. Используется только для сравнения в бенчмарках.
+
+    def __init__(self, character, monster, record=RECORD_NONE, rng=None):
+        self.character = character
+        self.monster = monster
+        self.character_hp = character.current_health
+        self.monster_hp = monster.health
+        self.turn_counter = 0
+        self.roll = make_roller(rng)
+        self.record = record
+        self.events = None if record == RECORD_NONE else []
+        self.character_agility = character.agility
+        self.monster_agility = monster.agility
+        # Прежний движок не ограничивал длину боя
+        self.last_turn = float('inf')
+
+    def character_attack(self):
+        self.character_base_damage = self.character.current_weapon.damage + self.character.strength
+        super().character_attack()
+
+    def monster_attack(self):
+        self.monster_base_damage = self.monster.weapon_damage + self.monster.strength
+        super().monster_attack()
+
+    def apply_character_abilities(self, base_damage):
+        damage = base_damage
+
+        if self.character.rogue_level >= 1:
+            if self.character.agility > self.monster.agility:
+                damage += 1
+                self.emit(ACTOR_CHARACTER, EVENT_SNEAK_ATTACK, 1)
+
+            if self.character.rogue_level >= 3:
+                poison_damage = self.turn_counter - 1
+                if poison_damage > 0:
+                    damage += poison_damage
+                    self.emit(ACTOR_CHARACTER, EVENT_POISON, poison_damage)
+
+        if self.character.warrior_level >= 1:
+            if self.turn_counter == 1:
+                weapon_damage = self.character.current_weapon.damage
+                damage += weapon_damage
+                self.emit(ACTOR_CHARACTER, EVENT_ACTION_SURGE, weapon_damage)
+
+        if self.character.barbarian_level >= 1:
+            if self.turn_counter <= 3:
+                damage += 2
+                self.emit(ACTOR_CHARACTER, EVENT_RAGE, 2)
+            else:
+                damage -= 1
+                self.emit(ACTOR_CHARACTER, EVENT_RAGE_FATIGUE, 1)
+
+        return max(0, damage)
+
+    def apply_character_defense(self, incoming_damage):
+        damage = incoming_damage
+
+        if self.character.warrior_level >= 2:
+            if self.character.strength > self.monster.strength:
+                damage -= 3
+                self.emit(ACTOR_CHARACTER, EVENT_SHIELD, 3)
+
+        if self.character.barbarian_level >= 2:
+            damage -= self.character.endurance
+            self.emit(ACTOR_CHARACTER, EVENT_STONE_SKIN, self.character.endurance)
+
+        return max(0, damage)
+
+    def apply_monster_abilities(self, base_damage):
+        damage = base_damage
+
+        if self.monster.name == "Призрак":
+            if self.monster.agility > self.character.agility:
+                damage += 1
+                self.emit(ACTOR_MONSTER, EVENT_SNEAK_ATTACK, 1)
+
+        elif self.monster.name == "Дракон":
+            if self.turn_counter % 3 == 0:
+                damage += 3
+                self.emit(ACTOR_MONSTER, EVENT_FIRE_BREATH, 3)
+
+        return damage
+
+    def apply_monster_defense(self, incoming_damage):
+        damage = incoming_damage
+
+        if self.monster.name == "Скелет":
+            if self.character.current_weapon.weapon_type == 'crushing':
+                damage *= 2
+                self.emit(ACTOR_MONSTER, EVENT_CRUSHING_WEAKNESS)
+
+        elif self.monster.name == "Слайм":
+            if self.character.current_weapon.weapon_type == 'slashing':
+                weapon_damage = self.character.current_weapon.damage
+                damage -= weapon_damage
+                self.emit(ACTOR_MONSTER, EVENT_SLASHING_IMMUNITY)
+
+        elif self.monster.name == "Голем":
+            damage -= self.monster.endurance
+            self.emit(ACTOR_MONSTER, EVENT_STONE_SKIN, self.monster.endurance)
+
+        return max(0, damage)
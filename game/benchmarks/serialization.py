@@ -0,0 +1,98 @@
+import argparse
+import random
+
+from game.benchmarks import setup, timed
+
+# Сборка ответов API: DRF-сериализаторы и JSONRenderer против game.payloads
+# и GameJSONRenderer (orjson, если установлен). Запуск:
+#   python -m game.benchmarks.serialization
+
+
+def battle_result(character, monster):
+    # Итог боя с текстовым логом, как в ответе POST /api/battle/start/
+    from game.battle_events import render_log
+    from game.battles import fight
+
+    result, events = fight(character, monster, seed=0)
+    result['log'] = render_log(events, monster.name)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--loops', type=int, default=20000, help='Повторов на замер')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup()
+
+    from rest_framework.renderers import JSONRenderer
+
+    from game import content_cache, renderers
+    from game.matchups import predict
+    from game.models import Character, Weapon
+    from game.payloads import character_payload, monster_payload
+    from game.renderers import GameJSONRenderer
+    from game.serializers import CharacterSerializer, MonsterSerializer
+
+    content_cache.get_catalog()
+    character = Character(
+        strength=2,
+        agility=3,
+        endurance=2,
+        rogue_level=1,
+        warrior_level=1,
+        barbarian_level=1,
+        total_level=3,
+        current_weapon=Weapon.objects.get(name='Меч'),
+    )
+    character.max_health = character.current_health = character.calculate_max_health()
+    monster = content_cache.random_monster(random.Random(0))
+
+    # Бой считается один раз: замеряется только сборка и кодирование ответа
+    result = battle_result(character, monster)
+    # Прогноз из таблицы matchups, как в ответе боя (None, если она не построена)
+    prediction = predict(character, monster)
+
+    def battle_body(build_character, build_monster):
+        return {
+            'battle_result': result,
+            'prediction': prediction,
+            'monster': build_monster(monster),
+            'character': build_character(character),
+        }
+
+    drf_renderer, fast_renderer = JSONRenderer(), GameJSONRenderer()
+    serializers = {
+        'character': lambda: CharacterSerializer(character).data,
+        'monster': lambda: MonsterSerializer(monster).data,
+        'battle': lambda: battle_body(
+            lambda c: CharacterSerializer(c).data, lambda m: MonsterSerializer(m).data
+        ),
+    }
+    payloads = {
+        'character': lambda: character_payload(character),
+        'monster': lambda: monster_payload(monster),
+        'battle': lambda: battle_body(character_payload, monster_payload),
+    }
+
+    print(f"orjson: {'да' if renderers.orjson is not None else 'нет'}, прогноз: {prediction}")
+    print(
+        f"{'ответ':<12}{'DRF, мкс':>10}{'словари, мкс':>14}{'+ рендерер, мкс':>17}{'ускорение':>11}"
+    )
+    for name in serializers:
+        build_old, build_new = serializers[name], payloads[name]
+        assert drf_renderer.render(build_old()) == fast_renderer.render(build_new())
+
+        def run(build, renderer):
+            for _ in range(args.loops):
+                renderer.render(build())
+
+        old = timed(lambda: run(build_old, drf_renderer), args.repeat) / args.loops * 1e6
+        dicts = timed(lambda: run(build_new, drf_renderer), args.repeat) / args.loops * 1e6
+        new = timed(lambda: run(build_new, fast_renderer), args.repeat) / args.loops * 1e6
+        print(f'{name:<12}{old:>10.1f}{dicts:>14.1f}{new:>17.1f}{old / new:>10.1f}x')
+
+
+if __name__ == '__main__':
+    main()
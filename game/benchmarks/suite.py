@@ -0,0 +1,279 @@
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from game.benchmarks import setup
+
+# Набор микробенчмарков движка и сквозных запросов к API.
+#
+#   python -m game.benchmarks.suite --output baseline.json
+#   python -m game.benchmarks.suite --compare baseline.json --threshold 0.1
+#
+# Для каждого бенчмарка сохраняется медиана и минимум времени одной операции
+# в наносекундах. При --compare медианы сравниваются с прошлым прогоном;
+# замедление больше порога — регрессия, код выхода 1.
+
+# Сборка 1/1/1: срабатывают способности первого уровня всех классов (скрытая
+# атака — против монстров с ловкостью меньше 3). Яд, щит и каменная кожа
+# требуют 2–3 уровня класса и здесь не замеряются
+BUILD = {
+    'strength': 2,
+    'agility': 3,
+    'endurance': 2,
+    'rogue_level': 1,
+    'warrior_level': 1,
+    'barbarian_level': 1,
+    'total_level': 3,
+}
+
+# Запросы к URL из game/urls.py: имя маршрута -> (метод, тело запроса)
+REQUESTS = {
+    'index': ('get', None),
+    'create_character': ('post', {'class': 'warrior'}),
+    'get_character': ('get', None),
+    'game_catalog': ('get', None),
+    'start_battle': ('post', {'log': 'text'}),
+    'stream_battle': ('post', {}),
+    'auto_run_battles': ('post', {'max_battles': 5, 'level_up': ['rogue'], 'take_reward': True}),
+    'level_up_character': ('post', {'class': 'rogue'}),
+    'change_weapon': ('post', {'weapon_id': 1}),
+    'battle_history': ('get', None),
+    'export_battle_history': ('get', None),
+    'async_create_character': ('post', {'class': 'warrior'}),
+    'async_get_character': ('get', None),
+    'async_start_battle': ('post', {'log': 'text'}),
+    'async_level_up_character': ('post', {'class': 'rogue'}),
+    'async_change_weapon': ('post', {'weapon_id': 1}),
+}
+
+
+def measure_loop(func, min_time, repeat):
+    # Подбираем число повторов так, чтобы один замер шел не меньше min_time
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops *= 2 if elapsed == 0 else max(2, int(min_time / elapsed * 1.2))
+
+    timings = [elapsed / loops]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        timings.append((time.perf_counter() - start) / loops)
+    return timings, loops
+
+
+def measure_calls(func, calls, prepare=None):
+    # Каждый вызов замеряется отдельно; prepare() в замер не входит
+    timings = []
+    for _ in range(calls):
+        if prepare is not None:
+            prepare()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings, 1
+
+
+def engine_benchmarks():
+    from game.battle_engine import BattleEngine
+    from game.battle_events import RECORD_NONE, RECORD_TEXT
+    from game.combatants import CharacterStats, MonsterStats
+    from game.models import Character, Monster, Weapon
+
+    model = Character(current_weapon=Weapon.objects.get(name='Меч'), **BUILD)
+    model.max_health = model.current_health = model.calculate_max_health()
+    character = CharacterStats.from_model(model)
+    monsters = [MonsterStats.from_model(monster) for monster in Monster.objects.order_by('id')]
+
+    benchmarks = {}
+    for monster in monsters:
+        rng = random.Random(0)
+        benchmarks[f'engine.fight[{monster.name}]'] = lambda monster=monster, rng=rng: BattleEngine(
+            character, monster, record=RECORD_NONE, rng=rng
+        ).fight()
+        benchmarks[f'engine.fight_text[{monster.name}]'] = (
+            lambda monster=monster, rng=rng: BattleEngine(
+                character, monster, record=RECORD_TEXT, rng=rng
+            ).fight()
+        )
+
+    # Способности монстра зависят от монстра: берем дракона (огненное дыхание)
+    engine = BattleEngine(character, monsters[-1], record=RECORD_NONE, rng=random.Random(0))
+    engine.turn_counter = 3
+    benchmarks['engine.check_hit'] = lambda: engine.check_hit(3, 2)
+    benchmarks['engine.apply_character_abilities'] = lambda: engine.apply_character_abilities(5)
+    benchmarks['engine.apply_character_defense'] = lambda: engine.apply_character_defense(5)
+    benchmarks['engine.apply_monster_abilities'] = lambda: engine.apply_monster_abilities(5)
+    benchmarks['engine.apply_monster_defense'] = lambda: engine.apply_monster_defense(5)
+    benchmarks['model.calculate_max_health'] = model.calculate_max_health
+    benchmarks['combatants.from_model'] = lambda: CharacterStats.from_model(model)
+    return benchmarks
+
+
+def serializer_benchmarks():
+    from rest_framework.renderers import JSONRenderer
+
+    from game.models import Character, Monster, Weapon
+    from game.payloads import character_payload, monster_payload
+    from game.renderers import GameJSONRenderer
+    from game.serializers import CharacterSerializer, MonsterSerializer
+
+    character = Character(current_weapon=Weapon.objects.get(name='Меч'), **BUILD)
+    character.max_health = character.current_health = character.calculate_max_health()
+    monster = Monster.objects.select_related('reward_weapon').order_by('id').last()
+    return {
+        'serializer.character': lambda: CharacterSerializer(character).data,
+        'serializer.monster': lambda: MonsterSerializer(monster).data,
+        'payload.character': lambda: character_payload(character),
+        'payload.monster': lambda: monster_payload(monster),
+        'render.drf': lambda: JSONRenderer().render(character_payload(character)),
+        'render.game': lambda: GameJSONRenderer().render(character_payload(character)),
+    }
+
+
+def http_benchmarks():
+    from django.test import Client
+    from django.urls import reverse
+
+    from game import urls
+    from game.models import Character
+
+    client = Client()
+    client.post('/api/character/create/', {'class': 'warrior'}, content_type='application/json')
+
+    def reset_levels():
+        # Повышение уровня замеряется всегда с первого уровня
+        Character.objects.filter(game_session__session_key=client.session.session_key).update(
+            rogue_level=0, warrior_level=1, barbarian_level=0, total_level=1
+        )
+
+    def request(method, path, data):
+        if method == 'get':
+            response = client.get(path)
+        else:
+            response = client.post(path, data, content_type='application/json')
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    benchmarks = {}
+    for pattern in urls.urlpatterns:
+        if pattern.name not in REQUESTS:
+            print(f'нет запроса для маршрута {pattern.name}, пропущен', file=sys.stderr)
+            continue
+        method, data = REQUESTS[pattern.name]
+        prepare = reset_levels if 'level_up' in pattern.name else None
+        benchmarks[f'http.{pattern.name}'] = (
+            lambda method=method, path=reverse(pattern.name), data=data: request(
+                method, path, data
+            ),
+            prepare,
+        )
+    return benchmarks
+
+
+def run(args):
+    results = {}
+
+    def record(name, timings, loops):
+        results[name] = {
+            'median_ns': statistics.median(timings) * 1e9,
+            'min_ns': min(timings) * 1e9,
+            'loops': loops,
+            'samples': len(timings),
+        }
+        print(f'{name:<45}{results[name]["median_ns"]:>14,.0f} нс')
+
+    micro = {**engine_benchmarks(), **serializer_benchmarks()}
+    for name, func in micro.items():
+        if args.filter in name:
+            record(name, *measure_loop(func, args.min_time, args.repeat))
+
+    for name, (func, prepare) in http_benchmarks().items():
+        if args.filter in name:
+            record(name, *measure_calls(func, args.calls, prepare))
+    return results
+
+
+def metadata():
+    import django
+    from django.db import connection
+
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'machine': platform.machine(),
+    }
+
+
+def compare(results, baseline, threshold):
+    # Возвращает число регрессий: медиана выросла больше чем на threshold
+    regressions = 0
+    print(f"\n{'бенчмарк':<45}{'было, нс':>14}{'стало, нс':>14}{'изм.':>9}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]['median_ns']
+        change = result['median_ns'] / before - 1
+        mark = ''
+        if change > threshold:
+            regressions += 1
+            mark = '  РЕГРЕССИЯ'
+        print(f'{name:<45}{before:>14,.0f}{result["median_ns"]:>14,.0f}{change:>+9.1%}{mark}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--output', help='Сохранить результаты в JSON')
+    parser.add_argument('--compare', help='JSON прошлого прогона для сравнения')
+    parser.add_argument(
+        '--threshold', type=float, default=0.1, help='Допустимое замедление (0.1 = 10%%)'
+    )
+    parser.add_argument('--filter', default='', help='Только бенчмарки, содержащие строку')
+    parser.add_argument('--repeat', type=int, default=5, help='Замеров на микробенчмарк')
+    parser.add_argument(
+        '--min-time', type=float, default=0.05, help='Минимальная длительность замера, с'
+    )
+    parser.add_argument('--calls', type=int, default=50, help='Запросов на HTTP-бенчмарк')
+    args = parser.parse_args()
+
+    setup()
+    results = run(args)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'meta': metadata(), 'results': results}, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f'\nРегрессий: {regressions} (порог {args.threshold:.0%})')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
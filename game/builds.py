@@ -0,0 +1,95 @@
+from itertools import product
+
+from .models import Character
+
+# Перебор всех достижимых сборок персонажа: базовые характеристики 1–3
+# (create_character), стартовый класс и до двух повышений уровня
+# (Character.level_up_class ограничивает total_level тремя).
+
+CLASSES = ('rogue', 'warrior', 'barbarian')
+BASE_STATS = range(1, 4)
+
+
+def build_key(character):
+    # Компактный целочисленный ключ сборки: по 3 бита на характеристику и уровень,
+    # 8 бит на здоровье
+    key = 0
+    for value in (
+        character.strength,
+        character.agility,
+        character.endurance,
+        character.rogue_level,
+        character.warrior_level,
+        character.barbarian_level,
+    ):
+        key = key * 8 + value
+    return key * 256 + character.max_health
+
+
+def decode_build_key(key):
+    key, health = divmod(key, 256)
+    values = []
+    for _ in range(6):
+        key, value = divmod(key, 8)
+        values.append(value)
+    strength, agility, endurance, rogue, warrior, barbarian = reversed(values)
+    return {
+        'strength': strength,
+        'agility': agility,
+        'endurance': endurance,
+        'rogue_level': rogue,
+        'warrior_level': warrior,
+        'barbarian_level': barbarian,
+        'max_health': health,
+    }
+
+
+def _new_character(strength, agility, endurance, character_class):
+    # Как в create_character: здоровье считается до назначения уровня класса
+    character = Character(strength=strength, agility=agility, endurance=endurance)
+    character.max_health = character.calculate_max_health()
+    setattr(character, f'{character_class}_level', 1)
+    character.current_health = character.max_health
+    return character
+
+
+def copy_build(character, weapon=None):
+    copy = Character(
+        strength=character.strength,
+        agility=character.agility,
+        endurance=character.endurance,
+        rogue_level=character.rogue_level,
+        warrior_level=character.warrior_level,
+        barbarian_level=character.barbarian_level,
+        current_health=character.current_health,
+        max_health=character.max_health,
+        total_level=character.total_level,
+    )
+    if weapon is not None:
+        copy.current_weapon = weapon
+    return copy
+
+
+def iter_builds():
+    """Уникальные достижимые сборки как несохраненные Character без оружия."""
+    seen = set()
+    frontier = [
+        _new_character(strength, agility, endurance, character_class)
+        for strength, agility, endurance in product(BASE_STATS, repeat=3)
+        for character_class in CLASSES
+    ]
+
+    while frontier:
+        next_frontier = []
+        for character in frontier:
+            key = build_key(character)
+            if key in seen:
+                continue
+            seen.add(key)
+            yield character
+
+            for character_class in CLASSES:
+                leveled = copy_build(character)
+                if leveled.apply_level_up(character_class):
+                    next_frontier.append(leveled)
+        frontier = next_frontier
@@ -0,0 +1,60 @@
+from typing import NamedTuple
+
+from .abilities import parse_ability_keys
+
+# Неизменяемые снимки участников боя.
+#
+# BattleEngine работает только с ними, а не с моделями Django: чтение поля
+# кортежа дешевле дескриптора модели, снимок занимает несколько байт при
+# передаче в другой процесс, а для боя не нужны ни настройки Django, ни БД.
+# Снимки строятся один раз на бой через from_model().
+
+
+class CharacterStats(NamedTuple):
+    strength: int
+    agility: int
+    endurance: int
+    rogue_level: int
+    warrior_level: int
+    barbarian_level: int
+    current_health: int
+    weapon_damage: int
+    weapon_type: str
+
+    @classmethod
+    def from_model(cls, character):
+        weapon = character.current_weapon
+        return cls(
+            strength=character.strength,
+            agility=character.agility,
+            endurance=character.endurance,
+            rogue_level=character.rogue_level,
+            warrior_level=character.warrior_level,
+            barbarian_level=character.barbarian_level,
+            current_health=character.current_health,
+            weapon_damage=weapon.damage,
+            weapon_type=weapon.weapon_type,
+        )
+
+
+class MonsterStats(NamedTuple):
+    name: str
+    health: int
+    weapon_damage: int
+    strength: int
+    agility: int
+    endurance: int
+    # Ключи способностей из game.abilities.MONSTER_ABILITIES
+    abilities: tuple = ()
+
+    @classmethod
+    def from_model(cls, monster):
+        return cls(
+            name=monster.name,
+            health=monster.health,
+            weapon_damage=monster.weapon_damage,
+            strength=monster.strength,
+            agility=monster.agility,
+            endurance=monster.endurance,
+            abilities=tuple(parse_ability_keys(monster.abilities)),
+        )
@@ -0,0 +1,185 @@
+import asyncio
+import hashlib
+import random
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+from .combatants import MonsterStats
+from .models import Monster, Weapon
+
+# Кэш статического контента (оружие и монстры) в памяти процесса.
+#
+# Загружается при первом обращении. После коммита изменения строк сигналы
+# вызывают invalidate(): каталог этого процесса сбрасывается, а общая версия в
+# кэше GAME_CATALOG_CACHE_ALIAS растет. Остальные процессы сверяют ее не чаще
+# раза в GAME_CATALOG_CHECK_INTERVAL секунд и перечитывают каталог, если она
+# изменилась. Если кэш не общий для процессов, каталог все равно перечитывается
+# раз в GAME_CATALOG_MAX_AGE секунд.
+
+VERSION_KEY = 'game.catalog.version'
+
+_lock = threading.Lock()
+_catalog = None
+# Растет при каждом сбросе: загрузка, начатая до сброса, свой результат не сохраняет
+_generation = 0
+
+
+def _tag(weapons, monsters):
+    # Отпечаток содержимого каталога: одинаков во всех процессах при одних данных
+    rows = [(weapon.id, weapon.name, weapon.damage, weapon.weapon_type) for weapon in weapons]
+    rows += [
+        (
+            monster.id,
+            monster.name,
+            monster.health,
+            monster.weapon_damage,
+            monster.strength,
+            monster.agility,
+            monster.endurance,
+            monster.special_ability,
+            monster.abilities,
+            monster.reward_weapon_id,
+        )
+        for monster in monsters
+    ]
+    return hashlib.sha1(repr(rows).encode()).hexdigest()[:16]
+
+
+def _load():
+    weapons = list(Weapon.objects.order_by('id'))
+    monsters = list(Monster.objects.select_related('reward_weapon').order_by('id'))
+    return {
+        'tag': _tag(weapons, monsters),
+        'weapons': weapons,
+        'weapons_by_id': {weapon.id: weapon for weapon in weapons},
+        'weapons_by_name': {weapon.name: weapon for weapon in weapons},
+        'monsters': monsters,
+        # Снимки монстров для BattleEngine строятся один раз на загрузку каталога
+        'monster_stats': {monster.id: MonsterStats.from_model(monster) for monster in monsters},
+        # Готовые словари ответов API (game.payloads), заполняются по мере обращения
+        'payloads': {},
+    }
+
+
+def _shared_cache():
+    return caches[settings.GAME_CATALOG_CACHE_ALIAS]
+
+
+def _is_fresh(catalog):
+    # Сверка с общей версией; при совпадении следующая сверка — через интервал
+    now = time.monotonic()
+    if now >= catalog['expires_at'] or _shared_cache().get(VERSION_KEY, 0) != catalog['version']:
+        return False
+    catalog['check_at'] = now + settings.GAME_CATALOG_CHECK_INTERVAL
+    return True
+
+
+def _in_event_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _reload():
+    global _catalog
+    with _lock:
+        catalog = _catalog
+        if catalog is not None and _is_fresh(catalog):
+            return catalog
+
+        generation = _generation
+        # Версия читается до строк: если изменение закоммитят во время загрузки,
+        # следующая проверка увидит новую версию и перечитает каталог
+        version = _shared_cache().get(VERSION_KEY, 0)
+        catalog = _load()
+        now = time.monotonic()
+        catalog.update(
+            version=version,
+            check_at=now + settings.GAME_CATALOG_CHECK_INTERVAL,
+            expires_at=now + settings.GAME_CATALOG_MAX_AGE,
+        )
+        if generation == _generation:
+            _catalog = catalog
+    return catalog
+
+
+def get_catalog():
+    catalog = _catalog
+    if catalog is not None and time.monotonic() < catalog['check_at']:
+        return catalog
+    if _in_event_loop():
+        # В async-коде каталог загружает и сверяет aget_catalog(): запрос к БД
+        # здесь недопустим, а каталог мог сбросить invalidate() из другого потока
+        if catalog is None:
+            raise RuntimeError('Каталог не загружен: в async-коде используйте aget_catalog()')
+        return catalog
+    return _reload()
+
+
+async def aget_catalog():
+    # В async-коде каталог загружается и сверяется через sync_to_async; дальше
+    # его передают в get_weapon()/random_monster() и др. аргументом catalog:
+    # повторное чтение _catalog после await может застать его сброшенным
+    catalog = _catalog
+    if catalog is None or time.monotonic() >= catalog['check_at']:
+        catalog = await sync_to_async(_reload)()
+    return catalog
+
+
+def _current(catalog):
+    return get_catalog() if catalog is None else catalog
+
+
+def catalog_tag(catalog=None):
+    return _current(catalog)['tag']
+
+
+def payload_cache():
+    # None, пока каталог не загружен: ради кэша ответов его не загружаем
+    catalog = _catalog
+    return None if catalog is None else catalog['payloads']
+
+
+def invalidate():
+    global _catalog, _generation
+    _generation += 1
+    _catalog = None
+    cache = _shared_cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+
+
+def get_weapon(weapon_id, catalog=None):
+    try:
+        return _current(catalog)['weapons_by_id'][int(weapon_id)]
+    except (KeyError, TypeError, ValueError):
+        raise Weapon.DoesNotExist(f"Weapon {weapon_id!r} does not exist") from None
+
+
+def get_weapon_by_name(name, catalog=None):
+    try:
+        return _current(catalog)['weapons_by_name'][name]
+    except KeyError:
+        raise Weapon.DoesNotExist(f"Weapon {name!r} does not exist") from None
+
+
+def get_monster_stats(monster, catalog=None):
+    stats = _current(catalog)['monster_stats'].get(monster.id)
+    if stats is None:
+        stats = MonsterStats.from_model(monster)
+    return stats
+
+
+def random_monster(rng=random, catalog=None):
+    monsters = _current(catalog)['monsters']
+    if not monsters:
+        raise Monster.DoesNotExist("No monsters in catalog")
+    return monsters[rng.randrange(len(monsters))]
@@ -0,0 +1,54 @@
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from . import content_cache
+from .models import Character
+
+# Условные GET: статус персонажа и каталог отдаются с сильным ETag, а запрос
+# с совпадающим If-None-Match получает 304 без сборки ответа.
+#
+# ETag статуса строится из id и версии персонажа (Character.version растет
+# с каждым боем, повышением уровня и сменой оружия) и отпечатка каталога:
+# в статусе есть оружие, а его строки меняются вместе с каталогом.
+
+
+def character_etag(character_id, version, catalog=None):
+    return f'"character-{character_id}-{version}-{content_cache.catalog_tag(catalog)}"'
+
+
+def catalog_etag():
+    return f'"catalog-{content_cache.catalog_tag()}"'
+
+
+def _version_queryset(session_key):
+    # Только id и версия: без оружия, без сборки ответа
+    return Character.objects.filter(game_session__session_key=session_key).values_list(
+        'id', 'version'
+    )
+
+
+def session_character_etag(session_key):
+    row = _version_queryset(session_key).first()
+    return None if row is None else character_etag(*row)
+
+
+async def asession_character_etag(session_key):
+    catalog = await content_cache.aget_catalog()
+    row = await _version_queryset(session_key).afirst()
+    return None if row is None else character_etag(*row, catalog=catalog)
+
+
+def not_modified(request, etag):
+    # Ответ 304 (или 412 при If-Match), если запрос условный и ETag совпал; иначе None
+    if etag is None:
+        return None
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        set_etag(response, etag)
+    return response
+
+
+def set_etag(response, etag):
+    response['ETag'] = etag
+    # Клиент может хранить ответ, но каждый раз сверяет ETag с сервером
+    patch_cache_control(response, no_cache=True)
+    return response
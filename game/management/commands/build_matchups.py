@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from game.matchups import rebuild_matchups, refresh_matchups
+
+
+class Command(BaseCommand):
+    help = 'Precompute battle outcomes for every reachable build, weapon and monster'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Пересчитать всю таблицу, а не только устаревшие и недостающие пары',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Расчет таблицы исходов...')
+
+        start = time.perf_counter()
+        count = rebuild_matchups() if options['full'] else refresh_matchups()
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(self.style.SUCCESS(f'Готово: {count} записей за {elapsed:.1f} с'))
@@ -48,6 +48,7 @@ class Command(BaseCommand):
                 'agility': 1,
                 'endurance': 1,
                 'special_ability': '',
+                'abilities': '',
                 'reward_weapon': kinzhal,
             },
             {
@@ -58,6 +59,7 @@ class Command(BaseCommand):
                 'agility': 2,
                 'endurance': 1,
                 'special_ability': 'Получает вдвое больше урона от дробящего оружия',
+                'abilities': 'crushing_weakness',
                 'reward_weapon': dubina,
             },
             {
@@ -68,6 +70,7 @@ class Command(BaseCommand):
                 'agility': 1,
                 'endurance': 2,
                 'special_ability': 'Рубящее оружие не наносит ему урона',
+                'abilities': 'slashing_immunity',
                 'reward_weapon': kopie,
             },
             {
@@ -78,6 +81,7 @@ class Command(BaseCommand):
                 'agility': 3,
                 'endurance': 1,
                 'special_ability': 'Имеет способность "скрытая атака"',
+                'abilities': 'sneak_attack',
                 'reward_weapon': mech,
             },
             {
@@ -88,6 +92,7 @@ class Command(BaseCommand):
                 'agility': 1,
                 'endurance': 3,
                 'special_ability': 'Имеет способность "каменная кожа"',
+                'abilities': 'stone_skin',
                 'reward_weapon': topor,
             },
             {
@@ -98,6 +103,7 @@ class Command(BaseCommand):
                 'agility': 3,
                 'endurance': 3,
                 'special_ability': 'Каждый 3-й ход дышит огнём (+3 урона)',
+                'abilities': 'fire_breath',
                 'reward_weapon': legendary_sword,
             },
         ]
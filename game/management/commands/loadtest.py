@@ -0,0 +1,210 @@
+import json
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from game.builds import CLASSES
+
+# Синтетические игроки проходят обычный сценарий через HTTP к уже запущенному
+# серверу (runserver, gunicorn, uvicorn): создание персонажа, бои, повышение
+# уровня и смена оружия на награду. Каждый игрок — поток со своей сессией.
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+
+    def add(self, endpoint, latency, status):
+        with self.lock:
+            self.latencies[endpoint].append(latency)
+            self.statuses[endpoint][status] += 1
+
+
+class Player:
+    def __init__(self, base_url, stats, options, seed):
+        self.base_url = base_url
+        self.stats = stats
+        self.options = options
+        self.rng = random.Random(seed)
+        self.http = requests.Session()
+
+    def call(self, endpoint, method, path, data=None):
+        start = time.perf_counter()
+        try:
+            response = self.http.request(
+                method, self.base_url + path, json=data, timeout=self.options['timeout']
+            )
+            status = response.status_code
+            # Ошибка блокировки БД: 409 от боя или 500 с "database is locked" (SQLite)
+            if status == 409 or (status >= 500 and b'database is locked' in response.content):
+                status = 'lock'
+        except requests.RequestException as e:
+            response = None
+            status = type(e).__name__
+        self.stats.add(endpoint, time.perf_counter() - start, status)
+
+        if self.options['think_time']:
+            time.sleep(self.rng.uniform(0, self.options['think_time']))
+        if response is None or response.status_code != 200:
+            return None
+        return response.json()
+
+    def new_character(self):
+        data = self.call('create', 'POST', 'character/create/', {'class': self.rng.choice(CLASSES)})
+        if data is not None:
+            self.call('status', 'GET', 'character/status/')
+        return data
+
+    def play(self, stop):
+        # Правила игры берутся из настроек проекта, как и на сервере
+        monsters_to_win = settings.RPG_GAME_SETTINGS['MONSTERS_TO_WIN']
+        max_level = settings.RPG_GAME_SETTINGS['MAX_CHARACTER_LEVEL']
+        character = self.new_character()
+        while not stop.is_set():
+            if character is None:
+                character = self.new_character()
+                continue
+
+            data = self.call('battle', 'POST', 'battle/start/', {'log': self.options['log']})
+            if data is None:
+                continue
+            winner = data['battle_result']['winner']
+            character = data['character']
+
+            if winner == 'monster' or character['monsters_defeated'] >= monsters_to_win:
+                # Поражение или пройденная игра: начинаем заново
+                character = self.new_character()
+            elif winner == 'character':
+                if (
+                    character['total_level'] < max_level
+                    and self.rng.random() < self.options['level_up']
+                ):
+                    self.call(
+                        'levelup', 'POST', 'character/levelup/', {'class': self.rng.choice(CLASSES)}
+                    )
+                if self.rng.random() < self.options['take_weapon']:
+                    self.call(
+                        'weapon',
+                        'POST',
+                        'character/weapon/',
+                        {'weapon_id': data['monster']['reward_weapon']['id']},
+                    )
+
+
+class Command(BaseCommand):
+    help = 'Run concurrent synthetic players against a running server and report latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Адрес сервера')
+        parser.add_argument('--players', type=int, default=10, help='Число игроков (потоков)')
+        parser.add_argument('--duration', type=float, default=30, help='Длительность, с')
+        parser.add_argument(
+            '--ramp-up', type=float, default=5, help='За сколько секунд стартуют все игроки'
+        )
+        parser.add_argument(
+            '--async-api', action='store_true', help='Использовать /api/async/ (ASGI-сервер)'
+        )
+        parser.add_argument(
+            '--think-time', type=float, default=0.0, help='Пауза игрока после запроса: 0..N с'
+        )
+        parser.add_argument(
+            '--level-up', type=float, default=0.5, help='Вероятность повысить уровень после победы'
+        )
+        parser.add_argument(
+            '--take-weapon', type=float, default=0.5, help='Вероятность взять оружие-награду'
+        )
+        parser.add_argument(
+            '--log', default='none', choices=['none', 'events', 'text'], help='Лог боя в ответе'
+        )
+        parser.add_argument('--timeout', type=float, default=10, help='Таймаут запроса, с')
+        parser.add_argument('--seed', type=int, default=0, help='Зерно поведения игроков')
+        parser.add_argument('--output', help='Сохранить отчет в JSON')
+
+    def handle(self, *args, **options):
+        base_url = options['url'].rstrip('/') + ('/api/async/' if options['async_api'] else '/api/')
+        try:
+            requests.get(options['url'], timeout=options['timeout'])
+        except requests.RequestException as e:
+            raise CommandError(f'Сервер {options["url"]} недоступен: {e}')
+
+        stats = Stats()
+        stop = threading.Event()
+        players = [
+            Player(base_url, stats, options, seed=options['seed'] * 100003 + i)
+            for i in range(options['players'])
+        ]
+        threads = [
+            threading.Thread(target=player.play, args=(stop,), daemon=True) for player in players
+        ]
+
+        self.stdout.write(
+            f'{len(players)} игроков, разгон {options["ramp_up"]} с, '
+            f'длительность {options["duration"]} с, {base_url}'
+        )
+        start = time.perf_counter()
+        step = options['ramp_up'] / len(threads) if threads else 0
+        for thread in threads:
+            thread.start()
+            time.sleep(step)
+        time.sleep(max(0, options['duration'] - (time.perf_counter() - start)))
+        stop.set()
+        for thread in threads:
+            thread.join(options['timeout'] + 1)
+        elapsed = time.perf_counter() - start
+
+        report = self.report(stats, elapsed)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+
+    def report(self, stats, elapsed):
+        def percentile(values, q):
+            return values[min(len(values) - 1, int(q * len(values)))] * 1000
+
+        self.stdout.write(
+            f"\n{'endpoint':<10}{'запросов':>10}{'запр/с':>9}{'p50, мс':>10}{'p95, мс':>10}"
+            f"{'p99, мс':>10}{'ошибок':>9}{'блок.':>7}"
+        )
+        endpoints = {}
+        with stats.lock:
+            for endpoint, latencies in sorted(stats.latencies.items()):
+                latencies = sorted(latencies)
+                statuses = stats.statuses[endpoint]
+                total = len(latencies)
+                locks = statuses.get('lock', 0)
+                errors = sum(
+                    count
+                    for status, count in statuses.items()
+                    if not isinstance(status, int) or status >= 500
+                )
+                endpoints[endpoint] = {
+                    'requests': total,
+                    'rps': total / elapsed,
+                    'p50_ms': percentile(latencies, 0.5),
+                    'p95_ms': percentile(latencies, 0.95),
+                    'p99_ms': percentile(latencies, 0.99),
+                    'error_rate': errors / total,
+                    'lock_errors': locks,
+                    'statuses': {str(status): count for status, count in statuses.items()},
+                }
+                row = endpoints[endpoint]
+                self.stdout.write(
+                    f"{endpoint:<10}{total:>10}{row['rps']:>9.1f}{row['p50_ms']:>10.1f}"
+                    f"{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['error_rate']:>9.1%}"
+                    f"{locks:>7}"
+                )
+
+        total = sum(row['requests'] for row in endpoints.values())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\nВсего: {total} запросов за {elapsed:.1f} с, {total / elapsed:.1f} запр/с'
+            )
+        )
+        return {'elapsed': elapsed, 'requests': total, 'endpoints': endpoints}
@@ -0,0 +1,93 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Func, IntegerField, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from game.models import BattleLog, Character, GameSession
+
+
+class OctetLength(Func):
+    # Размер значения в байтах. Length считает символы, а текстовый лог в UTF-8
+    # (кириллица, эмодзи) занимает больше байт, чем символов
+    function = 'OCTET_LENGTH'
+    output_field = IntegerField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # OCTET_LENGTH появился только в SQLite 3.43
+        return self.as_sql(
+            compiler, connection, template='LENGTH(CAST(%(expressions)s AS BLOB))', **extra_context
+        )
+
+
+class Command(BaseCommand):
+    help = 'Delete expired game sessions with their characters and battle logs in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-age',
+            type=int,
+            default=settings.SESSION_COOKIE_AGE,
+            help='Минимальный возраст игровой сессии в секундах',
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help='Сессий за транзакцию')
+        parser.add_argument(
+            '--pause', type=float, default=0.0, help='Пауза между пачками в секундах'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Только посчитать')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        cutoff = now - timedelta(seconds=options['max_age'])
+        batch_size = options['batch_size']
+
+        # Сессия истекла, если она старше cutoff и у нее нет живой django-сессии
+        live_keys = Session.objects.filter(expire_date__gt=now).values('session_key')
+        expired = (
+            GameSession.objects.filter(created_at__lt=cutoff)
+            .exclude(session_key__in=live_keys)
+            .order_by('id')
+        )
+
+        totals = {'sessions': 0, 'characters': 0, 'battle_logs': 0, 'bytes': 0}
+        last_id = 0
+        while True:
+            ids = list(expired.filter(id__gt=last_id).values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            last_id = ids[-1]
+
+            logs = BattleLog.objects.filter(game_session_id__in=ids)
+            characters = Character.objects.filter(game_session_id__in=ids)
+            totals['bytes'] += logs.aggregate(
+                size=Coalesce(Sum(OctetLength('events')), 0)
+                + Coalesce(Sum(OctetLength('log_data')), 0)
+            )['size']
+
+            if options['dry_run']:
+                totals['sessions'] += len(ids)
+                totals['characters'] += characters.count()
+                totals['battle_logs'] += logs.count()
+                continue
+
+            # Каждая пачка удаляется в своей короткой транзакции
+            with transaction.atomic():
+                totals['battle_logs'] += logs.delete()[0]
+                totals['characters'] += characters.delete()[0]
+                totals['sessions'] += GameSession.objects.filter(id__in=ids).delete()[0]
+
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        verb = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{verb}: сессий {totals['sessions']}, персонажей {totals['characters']}, "
+                f"логов боев {totals['battle_logs']}, {totals['bytes']} байт данных логов"
+            )
+        )
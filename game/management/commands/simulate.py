@@ -0,0 +1,134 @@
+import csv
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from game.battle_engine import BattleEngine
+from game.battle_events import RECORD_NONE
+from game.combatants import CharacterStats, MonsterStats
+
+FIELDS = [
+    'strength',
+    'agility',
+    'endurance',
+    'rogue_level',
+    'warrior_level',
+    'barbarian_level',
+    'max_health',
+    'weapon',
+    'monster',
+    'fights',
+    'wins',
+    'draws',
+    'win_rate',
+    'mean_turns',
+    'mean_damage_taken',
+]
+
+
+def _run_chunk(task):
+    # Воркер получает только снимки game.combatants: модели и настройки Django
+    # ему не нужны, поэтому модули с моделями импортируются в handle()
+    seed, pairs, fights = task
+    # Независимый поток случайных чисел на каждый кусок задачи
+    rng = random.Random(seed)
+
+    counters = []
+    for label, character, monster in pairs:
+        wins = draws = turns = damage_taken = 0
+        for _ in range(fights):
+            engine = BattleEngine(character, monster, record=RECORD_NONE, rng=rng)
+            result = engine.fight()
+            if result['winner'] == 'character':
+                wins += 1
+            elif result['winner'] == 'draw':
+                draws += 1
+            turns += engine.turn_counter
+            damage_taken += character.current_health - result['character_hp']
+        counters.append((label, wins, draws, turns, damage_taken))
+    return counters
+
+
+class Command(BaseCommand):
+    help = 'Simulate battles for every reachable build, weapon and monster in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fights', type=int, default=100, help='Боев на каждую пару')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Число процессов')
+        parser.add_argument('--seed', type=int, default=0, help='Начальное зерно ГСЧ')
+        parser.add_argument('--chunk-size', type=int, default=50, help='Пар на одну задачу')
+        parser.add_argument(
+            '--output', default='simulation.csv', help='Файл результатов (.csv или .json)'
+        )
+
+    def handle(self, *args, **options):
+        from game.builds import build_key, copy_build, decode_build_key, iter_builds
+        from game.models import Monster, Weapon
+
+        fights = options['fights']
+        weapons = list(Weapon.objects.all())
+        monsters = [MonsterStats.from_model(monster) for monster in Monster.objects.all()]
+
+        # Бои без возможного урона BattleEngine сам заканчивает ничьей
+        pairs = []
+        for character in iter_builds():
+            key = build_key(character)
+            for weapon in weapons:
+                armed = CharacterStats.from_model(copy_build(character, weapon))
+                for monster in monsters:
+                    pairs.append(((key, weapon.name, monster.name), armed, monster))
+
+        chunk_size = options['chunk_size']
+        chunks = [pairs[i : i + chunk_size] for i in range(0, len(pairs), chunk_size)]
+        seeds = np.random.SeedSequence(options['seed']).spawn(len(chunks))
+        tasks = [
+            (int(seed.generate_state(1)[0]), chunk, fights) for seed, chunk in zip(seeds, chunks)
+        ]
+
+        self.stdout.write(
+            f'Пар: {len(pairs)}, боев: {len(pairs) * fights}, процессов: {options["workers"]}'
+        )
+
+        start = time.perf_counter()
+        rows = []
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            for counters in executor.map(_run_chunk, tasks):
+                for (key, weapon, monster), wins, draws, turns, damage_taken in counters:
+                    row = decode_build_key(key)
+                    row.update(
+                        weapon=weapon,
+                        monster=monster,
+                        fights=fights,
+                        wins=wins,
+                        draws=draws,
+                        win_rate=wins / fights,
+                        mean_turns=turns / fights,
+                        mean_damage_taken=damage_taken / fights,
+                    )
+                    rows.append(row)
+        elapsed = time.perf_counter() - start
+
+        self._write(options['output'], rows)
+
+        total = len(pairs) * fights
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Готово за {elapsed:.1f} с: {total / elapsed:.0f} боев/с, '
+                f'результаты в {options["output"]}'
+            )
+        )
+
+    def _write(self, path, rows):
+        if path.endswith('.json'):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(rows, f, ensure_ascii=False)
+        else:
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=FIELDS)
+                writer.writeheader()
+                writer.writerows(rows)
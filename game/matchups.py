@@ -0,0 +1,101 @@
+from django.db import transaction
+
+from .battle_odds import battle_odds
+from .builds import build_key, iter_builds
+from .models import Matchup, Monster, Weapon
+
+# Таблица предрасчитанных исходов: для каждой достижимой сборки, оружия и
+# монстра хранится вероятность победы, средняя длина боя и средний урон.
+
+
+def compute_matchups(weapons, monsters):
+    builds = list(iter_builds())
+    rows = []
+    for weapon in weapons:
+        for character in builds:
+            character.current_weapon = weapon
+            key = build_key(character)
+            for monster in monsters:
+                odds = battle_odds(character, monster)
+                rows.append(
+                    Matchup(
+                        build_key=key,
+                        weapon=weapon,
+                        monster=monster,
+                        win_rate=odds['win'],
+                        mean_turns=odds['expected_turns'],
+                        mean_damage_taken=odds['expected_damage_taken'],
+                    )
+                )
+    return rows
+
+
+def rebuild_matchups(weapons=None, monsters=None):
+    """
+    Пересчитывает строки таблицы для переданного оружия и монстров.
+
+    Если указано только оружие (или только монстры), пересчитываются все его
+    пары с другой стороной. Без аргументов пересчитывается вся таблица.
+    """
+    if weapons is None and monsters is None:
+        weapons, monsters = list(Weapon.objects.all()), list(Monster.objects.all())
+        stale = Matchup.objects.all()
+    elif monsters is None:
+        monsters = list(Monster.objects.all())
+        stale = Matchup.objects.filter(weapon__in=weapons)
+    elif weapons is None:
+        weapons = list(Weapon.objects.all())
+        stale = Matchup.objects.filter(monster__in=monsters)
+    else:
+        stale = Matchup.objects.filter(weapon__in=weapons, monster__in=monsters)
+
+    rows = compute_matchups(weapons, monsters)
+    with transaction.atomic():
+        stale.delete()
+        Matchup.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def outdated_pairs(weapons=None, monsters=None):
+    # Пары (оружие, монстр) без актуальных строк: помеченные устаревшими или
+    # еще не посчитанные (новое оружие или монстр). Пара пересчитывается целиком,
+    # поэтому ее строки либо все актуальны, либо все нет
+    if weapons is None:
+        weapons = list(Weapon.objects.all())
+    if monsters is None:
+        monsters = list(Monster.objects.all())
+    fresh = set(
+        Matchup.objects.filter(stale=False).values_list('weapon_id', 'monster_id').distinct()
+    )
+    return [
+        (weapon, monster)
+        for weapon in weapons
+        for monster in monsters
+        if (weapon.id, monster.id) not in fresh
+    ]
+
+
+def refresh_matchups():
+    """Пересчитывает только устаревшие и недостающие пары, возвращает число строк."""
+    return sum(
+        rebuild_matchups(weapons=[weapon], monsters=[monster])
+        for weapon, monster in outdated_pairs()
+    )
+
+
+def _prediction_queryset(character, monster):
+    # Один запрос по уникальному индексу (build_key, weapon, monster)
+    return Matchup.objects.filter(
+        build_key=build_key(character),
+        weapon_id=character.current_weapon_id,
+        monster=monster,
+        stale=False,
+    ).values('win_rate', 'mean_turns', 'mean_damage_taken')
+
+
+def predict(character, monster):
+    return _prediction_queryset(character, monster).first()
+
+
+async def apredict(character, monster):
+    return await _prediction_queryset(character, monster).afirst()
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-18 00:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0002_rename_features_monster_special_ability_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='battlelog',
+            name='monster',
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                to='game.monster',
+            ),
+        ),
+    ]
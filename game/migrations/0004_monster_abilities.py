@@ -0,0 +1,37 @@
+# Generated by Django 5.2.5 on 2026-10-18 00:48
+
+import game.abilities
+from django.db import migrations, models
+
+# Способности существующих монстров (раньше определялись по имени в BattleEngine)
+MONSTER_ABILITIES = {
+    'Призрак': 'sneak_attack',
+    'Дракон': 'fire_breath',
+    'Скелет': 'crushing_weakness',
+    'Слайм': 'slashing_immunity',
+    'Голем': 'stone_skin',
+}
+
+
+def fill_abilities(apps, schema_editor):
+    Monster = apps.get_model('game', 'Monster')
+    for name, abilities in MONSTER_ABILITIES.items():
+        Monster.objects.filter(name=name).update(abilities=abilities)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0003_battlelog_monster'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monster',
+            name='abilities',
+            field=models.CharField(
+                blank=True, max_length=200, validators=[game.abilities.validate_monster_abilities]
+            ),
+        ),
+        migrations.RunPython(fill_abilities, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.5 on 2026-10-18 00:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0004_monster_abilities'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Matchup',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name='ID'
+                    ),
+                ),
+                ('build_key', models.IntegerField()),
+                ('win_rate', models.FloatField()),
+                ('mean_turns', models.FloatField()),
+                ('mean_damage_taken', models.FloatField()),
+                (
+                    'monster',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to='game.monster'
+                    ),
+                ),
+                (
+                    'weapon',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to='game.weapon'
+                    ),
+                ),
+            ],
+            options={
+                'constraints': [
+                    models.UniqueConstraint(
+                        fields=('build_key', 'weapon', 'monster'), name='unique_matchup'
+                    )
+                ],
+            },
+        ),
+    ]
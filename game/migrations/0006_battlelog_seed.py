@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-18 00:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0005_matchup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='battlelog',
+            name='character_state',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='battlelog',
+            name='seed',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='battlelog',
+            name='log_data',
+            field=models.TextField(blank=True),
+        ),
+    ]
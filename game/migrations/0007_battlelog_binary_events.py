@@ -0,0 +1,72 @@
+# Generated by Django 5.2.5 on 2026-10-18 00:55
+
+import json
+import struct
+import zlib
+
+from django.db import migrations, models
+
+# Формат записи из game.battle_events на момент миграции
+EVENT_RECORD = struct.Struct('<HBBh')
+FORMAT_RAW = 0
+FORMAT_ZLIB = 1
+
+
+def encode_events(events):
+    raw = b''.join(EVENT_RECORD.pack(*event) for event in events)
+    packed = zlib.compress(raw)
+    if len(packed) < len(raw):
+        return bytes([FORMAT_ZLIB]) + packed
+    return bytes([FORMAT_RAW]) + raw
+
+
+def decode_events(blob):
+    blob = bytes(blob)
+    data = zlib.decompress(blob[1:]) if blob[0] == FORMAT_ZLIB else blob[1:]
+    return [list(event) for event in EVENT_RECORD.iter_unpack(data)]
+
+
+def pack_logs(apps, schema_editor):
+    # JSON-списки событий переводятся в двоичный формат; текстовые логи
+    # разбирает обратно в события миграция 0014
+    BattleLog = apps.get_model('game', 'BattleLog')
+    batch = []
+    for log in BattleLog.objects.exclude(log_data='').only('id', 'log_data').iterator():
+        entries = json.loads(log.log_data)
+        if entries and isinstance(entries[0], str):
+            continue
+        log.events = encode_events(entries)
+        log.log_data = ''
+        batch.append(log)
+        if len(batch) >= 1000:
+            BattleLog.objects.bulk_update(batch, ['events', 'log_data'])
+            batch = []
+    BattleLog.objects.bulk_update(batch, ['events', 'log_data'])
+
+
+def unpack_logs(apps, schema_editor):
+    BattleLog = apps.get_model('game', 'BattleLog')
+    batch = []
+    for log in BattleLog.objects.exclude(events=b'').only('id', 'events').iterator():
+        log.log_data = json.dumps(decode_events(log.events), separators=(',', ':'))
+        batch.append(log)
+        if len(batch) >= 1000:
+            BattleLog.objects.bulk_update(batch, ['log_data'])
+            batch = []
+    BattleLog.objects.bulk_update(batch, ['log_data'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0006_battlelog_seed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='battlelog',
+            name='events',
+            field=models.BinaryField(blank=True, default=b''),
+        ),
+        migrations.RunPython(pack_logs, unpack_logs),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 00:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0007_battlelog_binary_events'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='battlelog',
+            index=models.Index(
+                fields=['game_session', 'battle_number'], name='battlelog_session_number'
+            ),
+        ),
+    ]
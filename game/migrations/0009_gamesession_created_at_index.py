@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-18 00:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0008_battlelog_session_number_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gamesession',
+            index=models.Index(fields=['created_at'], name='gamesession_created_at'),
+        ),
+    ]
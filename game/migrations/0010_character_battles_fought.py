@@ -0,0 +1,53 @@
+from django.db import migrations, models
+
+
+def renumber_battles(apps, schema_editor):
+    # Старые логи могли получить одинаковые номера (номер брался из
+    # monsters_defeated, который не растет при поражении): нумеруем заново по id
+    Character = apps.get_model('game', 'Character')
+    BattleLog = apps.get_model('game', 'BattleLog')
+
+    changed = []
+    counts = {}
+    queryset = BattleLog.objects.order_by('game_session_id', 'id').only(
+        'id', 'game_session_id', 'battle_number'
+    )
+    for battle_log in queryset.iterator(chunk_size=1000):
+        number = counts.get(battle_log.game_session_id, 0) + 1
+        counts[battle_log.game_session_id] = number
+        if battle_log.battle_number != number:
+            battle_log.battle_number = number
+            changed.append(battle_log)
+        if len(changed) >= 1000:
+            BattleLog.objects.bulk_update(changed, ['battle_number'])
+            changed = []
+    BattleLog.objects.bulk_update(changed, ['battle_number'])
+
+    for game_session_id, number in counts.items():
+        Character.objects.filter(game_session_id=game_session_id).update(battles_fought=number)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0009_gamesession_created_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='character',
+            name='battles_fought',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RemoveIndex(
+            model_name='battlelog',
+            name='battlelog_session_number',
+        ),
+        migrations.RunPython(renumber_battles, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='battlelog',
+            constraint=models.UniqueConstraint(
+                fields=('game_session', 'battle_number'), name='unique_session_battle_number'
+            ),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0010_character_battles_fought'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='character',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
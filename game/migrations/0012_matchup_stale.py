@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0011_character_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='matchup',
+            name='stale',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+def mark_matchups_stale(apps, schema_editor):
+    # Прогнозы считались с ранней ничьей для сборок с ядом, который пробивает
+    # защиту монстра только после 9-го хода: пересчитает build_matchups
+    Matchup = apps.get_model('game', 'Matchup')
+    Matchup.objects.update(stale=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0012_matchup_stale'),
+    ]
+
+    operations = [
+        migrations.RunPython(mark_matchups_stale, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,184 @@
+import json
+import re
+import struct
+import zlib
+
+from django.db import migrations
+
+# Логи, записанные до двоичного формата, хранят готовый текст (JSON-список
+# строк). Строки разбираются обратно в события по шаблонам текста; запись
+# переводится в двоичный формат, только если текст, построенный из событий,
+# совпадает с исходным строка в строку. Остальные записи (монстр удален или
+# переименован, текст не по шаблонам) остаются текстом: BattleLog.get_log_lines()
+# читает оба формата.
+
+# Форматы и коды из game.battle_events на момент миграции
+EVENT_RECORD = struct.Struct('<HBBh')
+FORMAT_RAW = 0
+FORMAT_ZLIB = 1
+
+ACTOR_CHARACTER = 0
+ACTOR_MONSTER = 1
+
+EVENT_START = 0
+EVENT_ATTACK = 1
+EVENT_MISS = 2
+EVENT_HIT = 3
+EVENT_ABSORBED = 4
+EVENT_VICTORY = 15
+EVENT_DEFEAT = 16
+
+# Шаблоны строк с одним событием: (актор, код) -> текст
+MESSAGES = {
+    (ACTOR_CHARACTER, EVENT_ATTACK): 'Ход {turn}: Персонаж атакует!',
+    (ACTOR_MONSTER, EVENT_ATTACK): 'Ход {turn}: {name} атакует!',
+    (ACTOR_CHARACTER, 5): '🗡️ Скрытая атака! +{value} урон',
+    (ACTOR_CHARACTER, 6): '☠️ Яд! +{value} урон',
+    (ACTOR_CHARACTER, 7): '⚡ Порыв к действию! +{value} урон',
+    (ACTOR_CHARACTER, 8): '🔥 Ярость! +{value} урон',
+    (ACTOR_CHARACTER, 9): '😤 Усталость от ярости! -{value} урон',
+    (ACTOR_CHARACTER, 10): '🛡️ Щит! -{value} урон',
+    (ACTOR_CHARACTER, 11): '🗿 Каменная кожа! -{value} урон',
+    (ACTOR_MONSTER, 5): '👻 {name} использует скрытую атаку! +{value} урон',
+    (ACTOR_MONSTER, 12): '🔥 {name} дышит огнем! +{value} урон',
+    (ACTOR_MONSTER, 13): '💀 {name} уязвим к дробящему! Урон удвоен',
+    (ACTOR_MONSTER, 14): '🟢 {name} невосприимчив к рубящему оружию!',
+    (ACTOR_MONSTER, 11): '🗿 {name} использует каменную кожу! -{value} урон',
+    (ACTOR_CHARACTER, EVENT_VICTORY): '🎉 Персонаж победил!',
+    (ACTOR_CHARACTER, EVENT_DEFEAT): '💀 Персонаж погиб...',
+}
+START = 'Бой начинается! {character_hp} HP vs {name} {monster_hp} HP'
+CHARACTER_HIT = '💥 Нанесено {value} урона! У {name} осталось {hp} HP'
+MONSTER_HIT = '💥 Получено {value} урона! Осталось {hp} HP'
+# Промах и поглощение относятся к тому, кто атакует в этом ходу
+MISS = '❌ Промах!'
+ABSORBED = '🛡️ Урон полностью поглощен!'
+
+
+def template_pattern(template):
+    pattern = re.escape(template)
+    for field in ('turn', 'value', 'hp', 'character_hp', 'monster_hp'):
+        pattern = pattern.replace(re.escape('{%s}' % field), f'(?P<{field}>-?\\d+)')
+    return re.compile(pattern.replace(re.escape('{name}'), '(?P<name>.+?)') + '$')
+
+
+START_PATTERN = template_pattern(START)
+CHARACTER_HIT_PATTERN = template_pattern(CHARACTER_HIT)
+MONSTER_HIT_PATTERN = template_pattern(MONSTER_HIT)
+PATTERNS = [(key, template_pattern(template)) for key, template in MESSAGES.items()]
+
+
+def parse_log(lines):
+    # События и имя монстра из текста лога; None, если строка не по шаблону
+    match = START_PATTERN.match(lines[0]) if lines else None
+    if match is None:
+        return None
+    name = match['name']
+    events = [
+        (0, ACTOR_CHARACTER, EVENT_START, int(match['character_hp'])),
+        (0, ACTOR_MONSTER, EVENT_START, int(match['monster_hp'])),
+    ]
+    turn, attacker = 0, None
+    for line in lines[1:]:
+        if line == MISS or line == ABSORBED:
+            if attacker is None:
+                return None
+            events.append((turn, attacker, EVENT_MISS if line == MISS else EVENT_ABSORBED, 0))
+            continue
+        match = CHARACTER_HIT_PATTERN.match(line)
+        if match is not None:
+            events.append((turn, ACTOR_CHARACTER, EVENT_HIT, int(match['value'])))
+            continue
+        match = MONSTER_HIT_PATTERN.match(line)
+        if match is not None:
+            events.append((turn, ACTOR_MONSTER, EVENT_HIT, int(match['value'])))
+            continue
+        for (actor, code), pattern in PATTERNS:
+            match = pattern.match(line)
+            if match is not None and match.groupdict().get('name', name) == name:
+                break
+        else:
+            return None
+        if code == EVENT_ATTACK:
+            turn, attacker = int(match['turn']), actor
+        events.append((turn, actor, code, int(match.groupdict().get('value') or 0)))
+    return name, events
+
+
+def render_log(events, name):
+    # Текст лога из событий, как game.battle_events.render_log
+    lines = []
+    character_hp = monster_hp = 0
+    for turn, actor, code, value in events:
+        if code == EVENT_START:
+            if actor == ACTOR_CHARACTER:
+                character_hp = value
+            else:
+                monster_hp = value
+                lines.append(
+                    START.format(character_hp=character_hp, name=name, monster_hp=monster_hp)
+                )
+        elif code == EVENT_MISS:
+            lines.append(MISS)
+        elif code == EVENT_ABSORBED:
+            lines.append(ABSORBED)
+        elif code == EVENT_HIT and actor == ACTOR_CHARACTER:
+            monster_hp -= value
+            lines.append(CHARACTER_HIT.format(value=value, name=name, hp=max(0, monster_hp)))
+        elif code == EVENT_HIT:
+            character_hp -= value
+            lines.append(MONSTER_HIT.format(value=value, hp=max(0, character_hp)))
+        else:
+            lines.append(MESSAGES[(actor, code)].format(turn=turn, name=name, value=value))
+    return lines
+
+
+def encode_events(events):
+    raw = b''.join(EVENT_RECORD.pack(*event) for event in events)
+    packed = zlib.compress(raw)
+    if len(packed) < len(raw):
+        return bytes([FORMAT_ZLIB]) + packed
+    return bytes([FORMAT_RAW]) + raw
+
+
+def pack_text_logs(apps, schema_editor):
+    BattleLog = apps.get_model('game', 'BattleLog')
+    Monster = apps.get_model('game', 'Monster')
+    monster_ids = dict(Monster.objects.values_list('name', 'id'))
+
+    batch = []
+    queryset = BattleLog.objects.filter(events=b'').exclude(log_data='')
+    for log in queryset.only('id', 'monster_id', 'log_data').iterator(chunk_size=1000):
+        lines = json.loads(log.log_data)
+        if not lines or not isinstance(lines[0], str):
+            continue
+        parsed = parse_log(lines)
+        if parsed is None:
+            continue
+        name, events = parsed
+        # Имя монстра при чтении берется из связанной записи: без нее текст не восстановить
+        monster_id = log.monster_id or monster_ids.get(name)
+        if monster_id is None or monster_ids.get(name) != monster_id:
+            continue
+        if render_log(events, name) != lines:
+            continue
+        log.monster_id = monster_id
+        log.events = encode_events(events)
+        log.log_data = ''
+        batch.append(log)
+        if len(batch) >= 1000:
+            BattleLog.objects.bulk_update(batch, ['monster', 'events', 'log_data'])
+            batch = []
+    BattleLog.objects.bulk_update(batch, ['monster', 'events', 'log_data'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0013_stale_stalled_matchups'),
+    ]
+
+    operations = [
+        # Обратно не переводится: двоичные записи читаются так же, как текстовые
+        migrations.RunPython(pack_text_logs, migrations.RunPython.noop),
+    ]
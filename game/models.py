@@ -1,5 +1,13 @@
+import json
+import random
+
 from django.db import models
 
+from .abilities import validate_monster_abilities
+from .battle_engine import BattleEngine
+from .battle_events import RECORD_EVENTS, decode_events, render_log
+from .combatants import CharacterStats, MonsterStats
+
 
 class CharacterClass(models.TextChoices):
     ROGUE = 'rogue', 'Разбойник'
@@ -30,6 +38,10 @@ class Monster(models.Model):
     agility = models.IntegerField()
     endurance = models.IntegerField()
     special_ability = models.TextField(blank=True)
+    # Ключи способностей из game.abilities.MONSTER_ABILITIES через запятую
+    abilities = models.CharField(
+        max_length=200, blank=True, validators=[validate_monster_abilities]
+    )
     reward_weapon = models.ForeignKey(Weapon, on_delete=models.CASCADE)
 
     def __str__(self):
@@ -40,6 +52,11 @@ class GameSession(models.Model):
     session_key = models.CharField(max_length=40, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='gamesession_created_at'),
+        ]
+
 
 class Character(models.Model):
     game_session = models.OneToOneField(GameSession, on_delete=models.CASCADE)
@@ -61,8 +78,13 @@ class Character(models.Model):
 
     # Прогресс
     monsters_defeated = models.IntegerField(default=0)
+    battles_fought = models.IntegerField(default=0)
     total_level = models.IntegerField(default=1)
 
+    # Растет с каждым изменением, видимым в ответах API (бой, уровень, оружие):
+    # из нее строится ETag статуса персонажа (game.etags)
+    version = models.PositiveIntegerField(default=0)
+
     def save(self, *args, **kwargs):
         if not self.pk:
             # Расчет максимального здоровья при создании
@@ -81,7 +103,54 @@ class Character(models.Model):
     def get_total_damage(self):
         return self.current_weapon.damage + self.strength
 
+    def get_battle_state(self):
+        # Все, что влияет на исход боя: по этому состоянию и зерну бой можно повторить
+        return {
+            'strength': self.strength,
+            'agility': self.agility,
+            'endurance': self.endurance,
+            'rogue_level': self.rogue_level,
+            'warrior_level': self.warrior_level,
+            'barbarian_level': self.barbarian_level,
+            'current_health': self.current_health,
+            'weapon_id': self.current_weapon_id,
+        }
+
     def level_up_class(self, character_class):
+        if not self.apply_level_up(character_class):
+            return False
+
+        # Только поля, которые меняет повышение уровня: параллельный бой не теряет
+        # свой счетчик побед
+        self.save_changes(
+            [
+                'strength',
+                'agility',
+                'endurance',
+                'rogue_level',
+                'warrior_level',
+                'barbarian_level',
+                'total_level',
+                'max_health',
+                'current_health',
+            ]
+        )
+        return True
+
+    def save_changes(self, update_fields):
+        # Сохраняет поля и увеличивает версию; версия растет в БД (F), чтобы не
+        # потерять увеличение от параллельного боя, и читается обратно
+        self.version = models.F('version') + 1
+        self.save(update_fields=[*update_fields, 'version'])
+        self.refresh_from_db(fields=['version'])
+
+    async def asave_changes(self, update_fields):
+        self.version = models.F('version') + 1
+        await self.asave(update_fields=[*update_fields, 'version'])
+        await self.arefresh_from_db(fields=['version'])
+
+    def apply_level_up(self, character_class):
+        # Повышение уровня без сохранения в БД
         if self.total_level >= 3:
             return False
 
@@ -105,13 +174,76 @@ class Character(models.Model):
         elif character_class == 'barbarian' and self.barbarian_level == 3:
             self.endurance += 1
 
-        self.save()
         return True
 
 
+class Matchup(models.Model):
+    # Предрасчитанный исход боя для сборки персонажа (см. game.matchups)
+    build_key = models.IntegerField()
+    weapon = models.ForeignKey(Weapon, on_delete=models.CASCADE)
+    monster = models.ForeignKey(Monster, on_delete=models.CASCADE)
+    win_rate = models.FloatField()
+    mean_turns = models.FloatField()
+    mean_damage_taken = models.FloatField()
+    # Оружие или монстр изменились после расчета: строку пересчитает build_matchups
+    stale = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['build_key', 'weapon', 'monster'], name='unique_matchup'
+            ),
+        ]
+
+
 class BattleLog(models.Model):
     game_session = models.ForeignKey(GameSession, on_delete=models.CASCADE)
+    monster = models.ForeignKey(Monster, null=True, blank=True, on_delete=models.SET_NULL)
     battle_number = models.IntegerField()
-    log_data = models.TextField()  # JSON строка с логом боя
-    winner = models.CharField(max_length=20)  # 'character' или 'monster'
+    # События боя в двоичном виде (game.battle_events.encode_events)
+    events = models.BinaryField(blank=True, default=b'')
+    log_data = models.TextField(blank=True)  # Устаревший формат: JSON с логом боя
+    winner = models.CharField(max_length=20)  # 'character', 'monster' или 'draw'
+    # Зерно ГСЧ и состояние персонажа, по которым бой можно воспроизвести
+    seed = models.BigIntegerField(null=True, blank=True)
+    character_state = models.JSONField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # Номер боя берется из Character.battles_fought внутри транзакции боя
+            models.UniqueConstraint(
+                fields=['game_session', 'battle_number'], name='unique_session_battle_number'
+            ),
+        ]
+
+    def replay(self):
+        state = dict(self.character_state)
+        weapon = Weapon.objects.get(pk=state.pop('weapon_id'))
+        character = Character(current_weapon=weapon, **state)
+        engine = BattleEngine(
+            CharacterStats.from_model(character),
+            MonsterStats.from_model(self.monster),
+            record=RECORD_EVENTS,
+            rng=random.Random(self.seed),
+        )
+        return engine.fight()['events']
+
+    def get_events(self):
+        # None для старых записей, в которых хранится только готовый текст
+        if self.events:
+            return decode_events(self.events)
+        if not self.log_data:
+            return self.replay()
+
+        entries = json.loads(self.log_data)
+        if entries and isinstance(entries[0], str):
+            return None
+        return [tuple(event) for event in entries]
+
+    def get_log_lines(self):
+        events = self.get_events()
+        if events is None:
+            return json.loads(self.log_data)
+        monster_name = self.monster.name if self.monster else '?'
+        return render_log(events, monster_name)
@@ -0,0 +1,73 @@
+from . import content_cache, profiling
+
+# Словари ответов API для оружия, монстров и персонажа без DRF-сериализаторов.
+#
+# Ключи, порядок и типы полей совпадают с WeaponSerializer, MonsterSerializer
+# и CharacterSerializer из game.serializers, поэтому JSON ответа не меняется.
+# Оружие и монстры статичны: их словари строятся один раз и живут в каталоге
+# content_cache до его сброса. Закэшированные словари общие для всех запросов,
+# изменять их нельзя.
+
+
+def _weapon_payload(weapon):
+    return {
+        'id': weapon.id,
+        'name': weapon.name,
+        'damage': weapon.damage,
+        'weapon_type': weapon.weapon_type,
+        'weapon_type_display': weapon.get_weapon_type_display(),
+    }
+
+
+def _monster_payload(monster):
+    return {
+        'name': monster.name,
+        'health': monster.health,
+        'weapon_damage': monster.weapon_damage,
+        'strength': monster.strength,
+        'agility': monster.agility,
+        'endurance': monster.endurance,
+        'special_ability': monster.special_ability,
+        'reward_weapon': _cached('weapon', monster.reward_weapon, _weapon_payload),
+    }
+
+
+def _cached(kind, obj, build):
+    # Пока каталог не загружен (или объект не сохранен), словарь строится заново:
+    # загружать каталог ради ответа не нужно, в async-коде это был бы запрос к БД
+    payloads = content_cache.payload_cache()
+    if payloads is None or obj.pk is None:
+        return build(obj)
+    key = (kind, obj.pk)
+    payload = payloads.get(key)
+    if payload is None:
+        payload = payloads[key] = build(obj)
+    return payload
+
+
+@profiling.timed(profiling.SERIALIZE)
+def weapon_payload(weapon):
+    return _cached('weapon', weapon, _weapon_payload)
+
+
+@profiling.timed(profiling.SERIALIZE)
+def monster_payload(monster):
+    return _cached('monster', monster, _monster_payload)
+
+
+@profiling.timed(profiling.SERIALIZE)
+def character_payload(character):
+    return {
+        'strength': character.strength,
+        'agility': character.agility,
+        'endurance': character.endurance,
+        'rogue_level': character.rogue_level,
+        'warrior_level': character.warrior_level,
+        'barbarian_level': character.barbarian_level,
+        'current_health': character.current_health,
+        'max_health': character.max_health,
+        'current_weapon': _cached('weapon', character.current_weapon, _weapon_payload),
+        'monsters_defeated': character.monsters_defeated,
+        'battles_fought': character.battles_fought,
+        'total_level': character.total_level,
+    }
@@ -0,0 +1,294 @@
+import cProfile
+import functools
+import hmac
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+
+# Профилирование запросов (включается GAME_PROFILING['ENABLED']).
+#
+# ProfilingMiddleware открывает для запроса RequestProfile, а участки кода
+# отмечают себя через `with section(...)`: время складывается в профиль
+# текущего запроса. Запросы к БД считаются обработчиком execute_wrapper.
+# Выключенный слой не подключается вовсе (MiddlewareNotUsed), а section()
+# сводится к чтению ContextVar.
+#
+# Скользящие перцентили по маршрутам отдает /metrics/ в текстовом формате
+# Prometheus. Доступ: по токену (METRICS_TOKEN, заголовок
+# `Authorization: Bearer <токен>`), а без токена — по адресу соседа
+# (METRICS_ALLOWED_IPS, сверяется с REMOTE_ADDR). За обратным прокси REMOTE_ADDR —
+# адрес прокси: список адресов тогда пропустит любого, кто ходит через прокси,
+# поэтому там нужен токен. X-Forwarded-For не читается: его подделывает клиент.
+
+logger = logging.getLogger(__name__)
+
+DB = 'db'
+ENGINE = 'engine'
+SERIALIZE = 'serialize'
+SESSION = 'session'
+SECTIONS = (DB, ENGINE, SERIALIZE, SESSION)
+QUANTILES = (0.5, 0.95, 0.99)
+
+DEFAULTS = {
+    'ENABLED': False,
+    # Число последних запросов маршрута, по которым считаются перцентили
+    'WINDOW': 1000,
+    # Запросы дольше порога (мс) пишутся в лог; при PROFILE_DIR еще и cProfile-дамп
+    'SLOW_MS': 200,
+    'PROFILE_DIR': None,
+    # Токен для /metrics/; если задан, адрес клиента не проверяется
+    'METRICS_TOKEN': None,
+    # Адреса, с которых /metrics/ доступен без токена (REMOTE_ADDR, не X-Forwarded-For)
+    'METRICS_ALLOWED_IPS': ('127.0.0.1', '::1'),
+}
+
+_current = ContextVar('game_request_profile', default=None)
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'GAME_PROFILING', {})}
+
+
+class RequestProfile:
+    def __init__(self):
+        self.sections = dict.fromkeys(SECTIONS, 0.0)
+        self.queries = 0
+
+
+class section:
+    """Контекстный менеджер: добавляет время блока к разделу профиля запроса."""
+
+    __slots__ = ('name', 'profile', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.profile = _current.get()
+        if self.profile is not None:
+            self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        if self.profile is not None:
+            self.profile.sections[self.name] += time.perf_counter() - self.start
+
+
+def timed(name):
+    """Декоратор: время вызова функции (обычной или async) идет в раздел name."""
+
+    def decorator(func):
+        if iscoroutinefunction(func):
+
+            async def wrapper(*args, **kwargs):
+                with section(name):
+                    return await func(*args, **kwargs)
+
+        else:
+
+            def wrapper(*args, **kwargs):
+                with section(name):
+                    return func(*args, **kwargs)
+
+        return functools.wraps(func)(wrapper)
+
+    return decorator
+
+
+def time_query(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.queries += 1
+        profile.sections[DB] += time.perf_counter() - start
+
+
+def add_query_timer(connection, **kwargs):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+class Metrics:
+    def __init__(self, window):
+        self.lock = threading.Lock()
+        self.window = window
+        # Маршрут -> последние (длительность, разделы..., число запросов)
+        self.samples = defaultdict(lambda: deque(maxlen=self.window))
+        self.count = defaultdict(int)
+        self.total = defaultdict(float)
+
+    def add(self, route, duration, profile):
+        sample = (duration, *(profile.sections[name] for name in SECTIONS), profile.queries)
+        with self.lock:
+            self.samples[route].append(sample)
+            self.count[route] += 1
+            self.total[route] += duration
+
+    def render(self):
+        with self.lock:
+            snapshot = {route: list(samples) for route, samples in self.samples.items()}
+            count, total = dict(self.count), dict(self.total)
+
+        lines = [
+            '# HELP game_request_seconds Request duration, quantiles over the rolling window',
+            '# TYPE game_request_seconds summary',
+        ]
+        for route, samples in sorted(snapshot.items()):
+            durations = sorted(sample[0] for sample in samples)
+            for q in QUANTILES:
+                lines.append(
+                    f'game_request_seconds{{route="{route}",quantile="{q}"}} '
+                    f'{quantile(durations, q):.6f}'
+                )
+            lines.append(f'game_request_seconds_sum{{route="{route}"}} {total[route]:.6f}')
+            lines.append(f'game_request_seconds_count{{route="{route}"}} {count[route]}')
+
+        lines += [
+            '# HELP game_request_section_seconds Time per request spent in db/engine/serialize/session',
+            '# TYPE game_request_section_seconds gauge',
+        ]
+        for route, samples in sorted(snapshot.items()):
+            for index, name in enumerate(SECTIONS, start=1):
+                values = sorted(sample[index] for sample in samples)
+                for q in QUANTILES:
+                    lines.append(
+                        f'game_request_section_seconds{{route="{route}",section="{name}",'
+                        f'quantile="{q}"}} {quantile(values, q):.6f}'
+                    )
+
+        lines += [
+            '# HELP game_request_db_queries Database queries per request',
+            '# TYPE game_request_db_queries gauge',
+        ]
+        for route, samples in sorted(snapshot.items()):
+            values = sorted(sample[-1] for sample in samples)
+            for q in QUANTILES:
+                lines.append(
+                    f'game_request_db_queries{{route="{route}",quantile="{q}"}} '
+                    f'{quantile(values, q)}'
+                )
+        return '\n'.join(lines) + '\n'
+
+
+def quantile(values, q):
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0
+
+
+metrics = None
+
+
+class ProfilingMiddleware:
+    """
+    Замеряет каждый запрос и складывает результат в скользящие метрики.
+
+    Должен стоять первым в MIDDLEWARE, чтобы в замер попала запись сессии.
+    Для потоковых ответов замеряется время до первого байта.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        global metrics
+        config = get_config()
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+        self.slow = config['SLOW_MS'] / 1000
+        self.profile_dir = config['PROFILE_DIR']
+        if metrics is None:
+            metrics = Metrics(config['WINDOW'])
+
+        connection_created.connect(add_query_timer)
+        for connection in connections.all(initialized_only=True):
+            add_query_timer(connection)
+
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        # cProfile на каждый запрос: дамп сохраняется только для медленных
+        profiler = cProfile.Profile() if self.profile_dir else None
+        start = time.perf_counter()
+        try:
+            if profiler is not None:
+                profiler.enable()
+            response = self.get_response(request)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            _current.reset(token)
+        self.finish(request, time.perf_counter() - start, profile, profiler)
+        return response
+
+    async def __acall__(self, request):
+        # В async-режиме cProfile не используется: в профиль попали бы чужие корутины
+        profile = RequestProfile()
+        token = _current.set(profile)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, time.perf_counter() - start, profile, None)
+        return response
+
+    def finish(self, request, duration, profile, profiler):
+        match = request.resolver_match
+        route = (match.url_name or match.view_name) if match else 'unmatched'
+        metrics.add(route, duration, profile)
+
+        if duration < self.slow:
+            return
+        breakdown = ', '.join(f'{name} {profile.sections[name] * 1000:.1f} ms' for name in SECTIONS)
+        logger.warning(
+            'Slow request %s %s: %.1f ms (%s, %d queries)',
+            request.method,
+            request.path,
+            duration * 1000,
+            breakdown,
+            profile.queries,
+        )
+        if profiler is not None:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            path = os.path.join(
+                self.profile_dir, f'{route}-{time.time_ns()}-{duration * 1000:.0f}ms.prof'
+            )
+            profiler.dump_stats(path)
+
+
+def metrics_allowed(request):
+    config = get_config()
+    token = config['METRICS_TOKEN']
+    if token:
+        header = request.headers.get('Authorization', '')
+        return hmac.compare_digest(header.encode(), f'Bearer {token}'.encode())
+    return request.META.get('REMOTE_ADDR') in config['METRICS_ALLOWED_IPS']
+
+
+def metrics_view(request):
+    if metrics is None:
+        raise Http404
+    if not metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
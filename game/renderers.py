@@ -0,0 +1,64 @@
+from rest_framework.renderers import JSONRenderer
+
+from . import profiling
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# JSONRenderer, который кодирует ответ через orjson, если тот установлен.
+#
+# Результат побайтно совпадает с обычным JSONRenderer (компактные разделители,
+# ensure_ascii=False, экранированные U+2028/U+2029). Там, где orjson пишет
+# иначе (float с экспонентой, NaN и бесконечности, нестроковые ключи словаря,
+# целые больше 64 бит, ответ с отступами), ответ кодируется стандартным json.
+
+# repr() пишет float меньше 1e-4 и от 1e16 с экспонентой ('1e-05', '1e+16'),
+# orjson — '0.00001' и '1e16'. NaN и бесконечности orjson пишет как null, а
+# строгий JSONRenderer отвергает их с ValueError. Такие float ищутся в самих
+# данных до кодирования: ответ с ними отдается json (или падает, как в DRF)
+
+
+def orjson_compatible(value):
+    # False, если в данных есть float, который orjson запишет не так, как json
+    if isinstance(value, float):
+        return value == 0 or 1e-4 <= abs(value) < 1e16
+    if isinstance(value, dict):
+        return all(map(orjson_compatible, value.values()))
+    if isinstance(value, (list, tuple)):
+        return all(map(orjson_compatible, value))
+    return True
+
+
+if orjson is not None:
+    # Даты и dataclass кодирует JSONEncoder DRF, как и без orjson
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+
+class GameJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with profiling.section(profiling.SERIALIZE):
+            content = self.fast_render(data, accepted_media_type, renderer_context)
+            if content is None:
+                content = super().render(data, accepted_media_type, renderer_context)
+        return content
+
+    def fast_render(self, data, accepted_media_type, renderer_context):
+        # None — ответ нужно кодировать обычным JSONRenderer
+        if orjson is None or data is None:
+            return None
+        if not self.compact or self.ensure_ascii or not self.strict:
+            return None
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return None
+
+        if not orjson_compatible(data):
+            return None
+        try:
+            content = orjson.dumps(
+                data, default=self.encoder_class().default, option=ORJSON_OPTIONS
+            )
+        except TypeError:
+            return None
+        return content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
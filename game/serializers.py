@@ -1,9 +1,19 @@
 from rest_framework import serializers
 
-from .models import Character, Weapon, Monster
+from . import profiling
+from .models import BattleLog, Character, Weapon, Monster
 
 
-class WeaponSerializer(serializers.ModelSerializer):
+class ProfiledModelSerializer(serializers.ModelSerializer):
+    # Время сборки .data учитывается в профиле запроса (вложенные сериализаторы
+    # .data не вызывают, поэтому время не считается дважды)
+    @property
+    def data(self):
+        with profiling.section(profiling.SERIALIZE):
+            return super().data
+
+
+class WeaponSerializer(ProfiledModelSerializer):
     weapon_type_display = serializers.CharField(source='get_weapon_type_display', read_only=True)
 
     class Meta:
@@ -11,7 +21,7 @@ class WeaponSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'damage', 'weapon_type', 'weapon_type_display']
 
 
-class CharacterSerializer(serializers.ModelSerializer):
+class CharacterSerializer(ProfiledModelSerializer):
     current_weapon = WeaponSerializer(read_only=True)
 
     class Meta:
@@ -27,11 +37,12 @@ class CharacterSerializer(serializers.ModelSerializer):
             'max_health',
             'current_weapon',
             'monsters_defeated',
+            'battles_fought',
             'total_level',
         ]
 
 
-class MonsterSerializer(serializers.ModelSerializer):
+class MonsterSerializer(ProfiledModelSerializer):
     reward_weapon = WeaponSerializer(read_only=True)
 
     class Meta:
@@ -46,3 +57,11 @@ class MonsterSerializer(serializers.ModelSerializer):
             'special_ability',
             'reward_weapon',
         ]
+
+
+class BattleLogSerializer(ProfiledModelSerializer):
+    monster = serializers.CharField(source='monster.name', default=None, read_only=True)
+
+    class Meta:
+        model = BattleLog
+        fields = ['battle_number', 'monster', 'winner', 'created_at']
@@ -0,0 +1,134 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.core.cache import caches
+
+from . import profiling
+
+# Сессии читаются из кэша (LocMemCache или FileBasedCache), а в БД пишутся
+# только когда данные изменились или срок жизни строки пора продлить.
+#
+# При SESSION_SAVE_EVERY_REQUEST = True стандартный db-бэкенд обновляет строку
+# сессии на каждый запрос. Здесь срок в БД продлевается не чаще, чем раз в
+# GAME_SESSION_WRITE_INTERVAL секунд. Интервал должен быть намного меньше
+# SESSION_COOKIE_AGE: на это время срок строки в БД может отставать от cookie.
+#
+# LocMemCache живет внутри процесса. Если сервер запущен в несколько процессов,
+# используйте общий FileBasedCache, иначе процессы увидят разные данные сессии.
+
+KEY_PREFIX = 'game.session.'
+
+
+class SessionStore(DBStore):
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        self._cache = caches[settings.SESSION_CACHE_ALIAS]
+        # Срок действия строки в БД (unix time), известный после load()/save()
+        self._db_expiry = None
+        super().__init__(session_key)
+
+    @property
+    def cache_key(self):
+        return self.cache_key_prefix + self._get_or_create_session_key()
+
+    def _cache_entry(self, data, expiry):
+        self._db_expiry = expiry
+        self._cache.set(self.cache_key, (data, expiry), max(0, int(expiry - time.time())))
+
+    async def _acache_entry(self, data, expiry):
+        self._db_expiry = expiry
+        await self._cache.aset(
+            self.cache_key_prefix + self.session_key,
+            (data, expiry),
+            max(0, int(expiry - time.time())),
+        )
+
+    @profiling.timed(profiling.SESSION)
+    def load(self):
+        if self.session_key is not None:
+            entry = self._cache.get(self.cache_key)
+            if entry is not None:
+                data, self._db_expiry = entry
+                return data
+
+        s = self._get_session_from_db()
+        if s is None:
+            return {}
+
+        data = self.decode(s.session_data)
+        self._cache_entry(data, s.expire_date.timestamp())
+        return data
+
+    @profiling.timed(profiling.SESSION)
+    async def aload(self):
+        if self.session_key is not None:
+            entry = await self._cache.aget(self.cache_key_prefix + self.session_key)
+            if entry is not None:
+                data, self._db_expiry = entry
+                return data
+
+        s = await self._aget_session_from_db()
+        if s is None:
+            return {}
+
+        data = self.decode(s.session_data)
+        await self._acache_entry(data, s.expire_date.timestamp())
+        return data
+
+    def exists(self, session_key):
+        return self.cache_key_prefix + session_key in self._cache or super().exists(session_key)
+
+    async def aexists(self, session_key):
+        return await self._cache.ahas_key(
+            self.cache_key_prefix + session_key
+        ) or await super().aexists(session_key)
+
+    def _needs_refresh(self, expiry_age=None):
+        # Продлеваем срок строки в БД, если с последней записи прошло больше интервала
+        if self._db_expiry is None:
+            return True
+        if expiry_age is None:
+            expiry_age = self.get_expiry_age()
+        written_at = self._db_expiry - expiry_age
+        return time.time() - written_at >= settings.GAME_SESSION_WRITE_INTERVAL
+
+    @profiling.timed(profiling.SESSION)
+    def save(self, must_create=False):
+        if self.session_key is not None and not must_create:
+            if not self.modified and not self._needs_refresh():
+                return
+
+        super().save(must_create=must_create)
+        self._cache_entry(
+            self._get_session(no_load=must_create), self.get_expiry_date().timestamp()
+        )
+
+    @profiling.timed(profiling.SESSION)
+    async def asave(self, must_create=False):
+        if self.session_key is not None and not must_create:
+            if not self.modified and not self._needs_refresh(await self.aget_expiry_age()):
+                return
+
+        await super().asave(must_create=must_create)
+        await self._acache_entry(
+            await self._aget_session(no_load=must_create),
+            (await self.aget_expiry_date()).timestamp(),
+        )
+
+    def delete(self, session_key=None):
+        super().delete(session_key)
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+        self._cache.delete(self.cache_key_prefix + session_key)
+
+    async def adelete(self, session_key=None):
+        await super().adelete(session_key)
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+        await self._cache.adelete(self.cache_key_prefix + session_key)
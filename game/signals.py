@@ -0,0 +1,33 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import content_cache
+from .models import Matchup, Monster, Weapon
+
+
+@receiver(post_save, sender=Weapon)
+@receiver(post_delete, sender=Weapon)
+@receiver(post_save, sender=Monster)
+@receiver(post_delete, sender=Monster)
+def invalidate_content_cache(sender, **kwargs):
+    # Только после коммита: сброс внутри транзакции позволил бы параллельному
+    # запросу перечитать старые строки и держать их до следующей правки
+    transaction.on_commit(content_cache.invalidate)
+
+
+# Пересчет исходов занимает секунды и держал бы транзакцию сохранения (а с ней
+# запись боев). Поэтому строки только помечаются устаревшими, а пересчитывает их
+# build_matchups; до пересчета прогноз для них не выдается.
+
+
+@receiver(post_save, sender=Weapon)
+def mark_weapon_matchups_stale(sender, instance, raw=False, **kwargs):
+    if not raw:
+        Matchup.objects.filter(weapon=instance).update(stale=True)
+
+
+@receiver(post_save, sender=Monster)
+def mark_monster_matchups_stale(sender, instance, raw=False, **kwargs):
+    if not raw:
+        Matchup.objects.filter(monster=instance).update(stale=True)
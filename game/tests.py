@@ -0,0 +1,609 @@
+import importlib
+import json
+import random
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+import numpy as np
+from django.apps import apps
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.db import connection
+from django.test import (
+    Client,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from . import content_cache, profiling
+from .battle_engine import BattleEngine
+from .battle_simulator import character_vectors, monster_vectors, simulate_batch
+from .battle_events import (
+    ACTOR_CHARACTER,
+    ACTOR_MONSTER,
+    EVENT_ATTACK,
+    EVENT_DRAW,
+    EVENT_HIT,
+    EVENT_MISS,
+    EVENT_START,
+    FORMAT_RAW,
+    FORMAT_ZLIB,
+    RECORD_EVENTS,
+    RECORD_NONE,
+    decode_events,
+    encode_events,
+    render_log,
+)
+from .builds import build_key
+from .combatants import CharacterStats, MonsterStats
+from .models import BattleLog, Character, GameSession, Matchup, Monster
+from .renderers import GameJSONRenderer
+
+
+def character_stats(**fields):
+    stats = {
+        'strength': 2,
+        'agility': 2,
+        'endurance': 2,
+        'rogue_level': 0,
+        'warrior_level': 1,
+        'barbarian_level': 0,
+        'current_health': 10,
+        'weapon_damage': 3,
+        'weapon_type': 'slashing',
+    }
+    stats.update(fields)
+    return CharacterStats(**stats)
+
+
+def monster_stats(**fields):
+    stats = {
+        'name': 'Манекен',
+        'health': 10,
+        'weapon_damage': 1,
+        'strength': 1,
+        'agility': 1,
+        'endurance': 1,
+        'abilities': (),
+    }
+    stats.update(fields)
+    return MonsterStats(**stats)
+
+
+class GameAPITestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('init_game_data', stdout=StringIO())
+
+    def setUp(self):
+        # Каталог загружается заранее, как в работающем процессе
+        content_cache.invalidate()
+        content_cache.get_catalog()
+        self.post('/api/character/create/', {'class': 'warrior'})
+        self.character = Character.objects.get()
+
+    def post(self, path, data=None):
+        return self.client.post(path, json.dumps(data or {}), content_type='application/json')
+
+    def battle(self, monster_name, seed=1, log='none'):
+        # Противник из каталога и зерно боя фиксированы: исход боя не случаен
+        monster = next(m for m in content_cache.get_catalog()['monsters'] if m.name == monster_name)
+        with mock.patch.object(content_cache, 'random_monster', return_value=monster):
+            with mock.patch('game.battles.secrets.randbits', return_value=seed):
+                return self.post('/api/battle/start/', {'log': log})
+
+
+class QueryCountTests(GameAPITestCase):
+    # Бюджет запросов к БД для каждого представления API
+
+    def test_status(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/character/status/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_status_not_modified(self):
+        etag = self.client.get('/api/character/status/')['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/character/status/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_catalog(self):
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/catalog/')
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/catalog/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_battle_won(self):
+        Character.objects.update(strength=30, agility=30)
+        with self.assertNumQueries(8):
+            response = self.battle('Гоблин')
+        self.assertEqual(response.json()['battle_result']['winner'], 'character')
+
+    def test_battle_lost(self):
+        Character.objects.update(current_health=1, agility=1)
+        with self.assertNumQueries(7):
+            response = self.battle('Дракон')
+        self.assertEqual(response.json()['battle_result']['winner'], 'monster')
+
+    def test_battle_with_prediction(self):
+        # Прогноз из свежей строки Matchup читается тем же одним запросом
+        Character.objects.update(strength=30, agility=30)
+        self.character.refresh_from_db()
+        Matchup.objects.create(
+            build_key=build_key(self.character),
+            weapon_id=self.character.current_weapon_id,
+            monster=Monster.objects.get(name='Гоблин'),
+            win_rate=1.0,
+            mean_turns=1.0,
+            mean_damage_taken=0.0,
+        )
+        with self.assertNumQueries(8):
+            response = self.battle('Гоблин')
+        self.assertEqual(response.json()['prediction']['win_rate'], 1.0)
+
+    def test_level_up(self):
+        with self.assertNumQueries(5):
+            response = self.post('/api/character/levelup/', {'class': 'rogue'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_change_weapon(self):
+        weapon = content_cache.get_weapon_by_name('Топор')
+        with self.assertNumQueries(3):
+            response = self.post('/api/character/weapon/', {'weapon_id': weapon.id})
+        self.assertEqual(response.json()['new_weapon']['name'], 'Топор')
+
+    def test_history(self):
+        for seed in range(3):
+            self.battle('Гоблин', seed)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/battle/history/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_history_with_cursor(self):
+        for seed in range(3):
+            self.battle('Гоблин', seed)
+        cursor = self.client.get('/api/battle/history/', {'limit': 1}).json()['next_cursor']
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/battle/history/', {'cursor': cursor, 'log': 'text'})
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_export(self):
+        for seed in range(3):
+            self.battle('Гоблин', seed, log='text')
+        # Запросы идут при чтении потока, поэтому он читается внутри проверки
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/battle/history/export/', {'log': 'text'})
+            lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(len(lines), 3)
+
+
+class AsyncCatalogTests(GameAPITestCase):
+    # Каталог сбрасывается из другого потока сразу после aget_catalog():
+    # async-представления работают с полученным каталогом и не ходят в БД из цикла событий
+
+    async def apost(self, path, data):
+        return await self.async_client.post(path, data, content_type='application/json')
+
+    async def test_views_use_loaded_catalog(self):
+        aget_catalog = content_cache.aget_catalog
+
+        async def aget_then_invalidate():
+            catalog = await aget_catalog()
+            content_cache.invalidate()
+            return catalog
+
+        with mock.patch.object(content_cache, 'aget_catalog', aget_then_invalidate):
+            response = await self.apost('/api/async/character/create/', {'class': 'rogue'})
+            self.assertEqual(response.status_code, 200)
+            response = await self.async_client.get('/api/async/character/status/')
+            self.assertEqual(response.status_code, 200)
+            response = await self.async_client.get(
+                '/api/async/character/status/', headers={'If-None-Match': response['ETag']}
+            )
+            self.assertEqual(response.status_code, 304)
+            weapon = await self.apost('/api/async/character/weapon/', {'weapon_id': 1})
+            self.assertEqual(weapon.status_code, 200)
+            response = await self.apost('/api/async/battle/start/', {'log': 'none'})
+            self.assertEqual(response.status_code, 200)
+
+    async def test_sync_lookup_in_event_loop_never_queries(self):
+        content_cache.invalidate()
+        with self.assertRaises(RuntimeError):
+            content_cache.get_weapon(1)
+
+
+class ETagTests(GameAPITestCase):
+    def status(self, etag=None):
+        if etag is None:
+            return self.client.get('/api/character/status/')
+        return self.client.get('/api/character/status/', HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_character_is_not_modified(self):
+        response = self.status()
+        self.assertIn('no-cache', response['Cache-Control'])
+        not_modified = self.status(response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+        self.assertEqual(not_modified.content, b'')
+
+    def test_battle_changes_etag(self):
+        etag = self.status()['ETag']
+        self.battle('Гоблин')
+        response = self.status(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_level_up_and_weapon_change_etag(self):
+        etag = self.status()['ETag']
+        self.post('/api/character/levelup/', {'class': 'rogue'})
+        self.assertEqual(self.status(etag).status_code, 200)
+
+        etag = self.status()['ETag']
+        weapon = content_cache.get_weapon_by_name('Топор')
+        self.post('/api/character/weapon/', {'weapon_id': weapon.id})
+        self.assertEqual(self.status(etag).status_code, 200)
+
+    def test_catalog_edit_changes_etags(self):
+        status_etag = self.status()['ETag']
+        catalog_etag = self.client.get('/api/catalog/')['ETag']
+
+        # Сброс каталога выполняется после коммита транзакции
+        weapon = content_cache.get_weapon_by_name('Топор')
+        with self.captureOnCommitCallbacks(execute=True):
+            weapon.damage += 1
+            weapon.save()
+
+        self.assertEqual(self.status(status_etag).status_code, 200)
+        response = self.client.get('/api/catalog/', HTTP_IF_NONE_MATCH=catalog_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], catalog_etag)
+
+
+class RendererTests(GameAPITestCase):
+    def test_battle_without_prediction_is_rendered_by_orjson(self):
+        response = self.battle('Гоблин', log='events')
+        data = response.json()
+        self.assertIsNone(data['prediction'])
+
+        content = GameJSONRenderer().fast_render(data, None, None)
+        self.assertIsNotNone(content)
+        self.assertEqual(content, JSONRenderer().render(data))
+        self.assertEqual(content, response.content)
+
+    def test_floats_written_differently_fall_back_to_json(self):
+        for value in (1e-05, 1e16, 0.5):
+            with self.subTest(value=value):
+                data = {'value': value, 'none': None}
+                self.assertEqual(GameJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_non_finite_floats_raise(self):
+        for value in (float('nan'), float('inf'), -float('inf')):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                GameJSONRenderer().render({'values': [1, value]})
+
+
+class PruneSessionsTests(GameAPITestCase):
+    def test_reports_log_size_in_bytes(self):
+        self.battle('Гоблин')
+        BattleLog.objects.update(log_data=json.dumps(['Бой начинается! 🎉'], ensure_ascii=False))
+        GameSession.objects.update(created_at=timezone.now() - timedelta(days=365))
+        Session.objects.all().delete()
+
+        expected = sum(
+            len(events) + len(log_data.encode())
+            for events, log_data in BattleLog.objects.values_list('events', 'log_data')
+        )
+        out = StringIO()
+        call_command('prune_sessions', '--dry-run', stdout=out)
+        self.assertIn(f'{expected} байт', out.getvalue())
+        self.assertEqual(BattleLog.objects.count(), 1)
+
+
+@mock.patch.object(profiling, 'metrics', profiling.Metrics(10))
+class MetricsAccessTests(SimpleTestCase):
+    def get(self, remote_addr, **headers):
+        return self.client.get('/metrics/', REMOTE_ADDR=remote_addr, headers=headers)
+
+    def test_allowed_ips(self):
+        self.assertEqual(self.get('127.0.0.1').status_code, 200)
+        self.assertEqual(self.get('10.0.0.5').status_code, 403)
+        # Адрес из X-Forwarded-For не учитывается
+        self.assertEqual(self.get('10.0.0.5', x_forwarded_for='127.0.0.1').status_code, 403)
+
+    @override_settings(GAME_PROFILING={'METRICS_TOKEN': 'secret'})
+    def test_token(self):
+        # С токеном адрес прокси не важен, а localhost без токена не пускается
+        self.assertEqual(self.get('10.0.0.5', authorization='Bearer secret').status_code, 200)
+        self.assertEqual(self.get('10.0.0.5', authorization='Bearer wrong').status_code, 403)
+        self.assertEqual(self.get('127.0.0.1').status_code, 403)
+
+
+class TextBattleLogMigrationTests(GameAPITestCase):
+    migration = importlib.import_module('game.migrations.0014_pack_text_battle_logs')
+
+    def text_log(self, monster_name, battle_number):
+        # Запись в старом формате: готовый текст лога и без ссылки на монстра
+        engine = BattleEngine(
+            character_stats(rogue_level=3, current_health=30),
+            monster_stats(abilities=('stone_skin',)),
+            record=RECORD_EVENTS,
+            rng=random.Random(battle_number),
+        )
+        lines = render_log(engine.fight()['events'], monster_name)
+        return BattleLog.objects.create(
+            game_session_id=self.character.game_session_id,
+            battle_number=battle_number,
+            log_data=json.dumps(lines, ensure_ascii=False),
+            winner='character',
+        )
+
+    def test_text_logs_are_packed(self):
+        log = self.text_log('Голем', 1)
+        lines = log.get_log_lines()
+        self.migration.pack_text_logs(apps, None)
+
+        log.refresh_from_db()
+        self.assertEqual(log.log_data, '')
+        self.assertEqual(log.monster.name, 'Голем')
+        self.assertEqual(log.get_log_lines(), lines)
+
+    def test_unknown_monster_stays_text(self):
+        log = self.text_log('Удаленный монстр', 1)
+        self.migration.pack_text_logs(apps, None)
+
+        log.refresh_from_db()
+        self.assertEqual(bytes(log.events), b'')
+        self.assertIsNone(log.get_events())
+        self.assertEqual(log.get_log_lines(), json.loads(log.log_data))
+
+
+class ConcurrentBattleTests(TransactionTestCase):
+    # Параллельные бои и повышения уровня одной сессии на файловой SQLite
+    # (TEST NAME в настройках): потоки работают через свои соединения и ждут
+    # блокировку записи, как процессы сервера
+    threads = 6
+    battles_per_thread = 10
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('Нужна файловая БД: потоки in-memory SQLite делят одно соединение')
+        call_command('init_game_data', stdout=StringIO())
+        content_cache.invalidate()
+        self.client.post(
+            '/api/character/create/',
+            json.dumps({'class': 'warrior'}),
+            content_type='application/json',
+        )
+
+    def player(self, barrier, statuses):
+        client = Client()
+        client.cookies = self.client.cookies
+        try:
+            barrier.wait()
+            for number in range(self.battles_per_thread):
+                response = client.post(
+                    '/api/battle/start/',
+                    json.dumps({'log': 'none'}),
+                    content_type='application/json',
+                )
+                statuses.append(('battle', response.status_code))
+                if number == self.battles_per_thread // 2:
+                    response = client.post(
+                        '/api/character/levelup/',
+                        json.dumps({'class': 'rogue'}),
+                        content_type='application/json',
+                    )
+                    statuses.append(('levelup', response.status_code))
+        finally:
+            connection.close()
+
+    def test_battle_numbers_and_version(self):
+        version = Character.objects.get().version
+        barrier = threading.Barrier(self.threads)
+        statuses = []
+        threads = [
+            threading.Thread(target=self.player, args=(barrier, statuses))
+            for _ in range(self.threads)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        battles = self.threads * self.battles_per_thread
+        self.assertEqual(statuses.count(('battle', 200)), battles)
+        # Персонаж начинает с 1 уровнем: повысить его можно только дважды
+        level_ups = statuses.count(('levelup', 200))
+        self.assertEqual(level_ups, 2)
+        self.assertEqual(statuses.count(('levelup', 400)), self.threads - level_ups)
+
+        numbers = list(
+            BattleLog.objects.order_by('battle_number').values_list('battle_number', flat=True)
+        )
+        self.assertEqual(numbers, list(range(1, battles + 1)))
+        character = Character.objects.get()
+        self.assertEqual(character.battles_fought, battles)
+        self.assertEqual(character.total_level, 3)
+        self.assertEqual(character.version, version + battles + level_ups)
+
+
+class BattleEventsCodecTests(SimpleTestCase):
+    events = [
+        (0, ACTOR_CHARACTER, EVENT_START, 12),
+        (0, ACTOR_MONSTER, EVENT_START, 10),
+        (1, ACTOR_CHARACTER, EVENT_ATTACK, 0),
+        (1, ACTOR_CHARACTER, EVENT_HIT, 5),
+        (2, ACTOR_MONSTER, EVENT_HIT, -3),
+        (65535, ACTOR_CHARACTER, EVENT_DRAW, 32767),
+    ]
+
+    def test_round_trip(self):
+        for compress in (True, False):
+            with self.subTest(compress=compress):
+                self.assertEqual(decode_events(encode_events(self.events, compress)), self.events)
+
+    def test_compresses_only_when_smaller(self):
+        self.assertEqual(encode_events(self.events[:1])[0], FORMAT_RAW)
+        self.assertEqual(encode_events(self.events * 50)[0], FORMAT_ZLIB)
+        self.assertEqual(encode_events(self.events * 50, compress=False)[0], FORMAT_RAW)
+
+    def test_empty(self):
+        self.assertEqual(decode_events(b''), [])
+        self.assertEqual(decode_events(encode_events([])), [])
+        # BinaryField из БД приходит как memoryview
+        self.assertEqual(decode_events(memoryview(encode_events(self.events))), self.events)
+
+
+class BatchSimulatorTests(SimpleTestCase):
+    # Пакетная симуляция и BattleEngine на одних парах: доля побед, доля ничьих
+    # и среднее число ходов совпадают в пределах статистической погрешности
+    fights = 4000
+    matchups = {
+        'обычный бой': (character_stats(), monster_stats()),
+        'огненное дыхание': (
+            character_stats(barbarian_level=1, current_health=20),
+            monster_stats(health=15, agility=2, abilities=('fire_breath',)),
+        ),
+        # Урон только в первые три хода: ранняя ничья
+        'ранняя ничья': (
+            character_stats(warrior_level=0, barbarian_level=1, weapon_damage=1, strength=0),
+            monster_stats(weapon_damage=0, strength=0, endurance=2, abilities=('stone_skin',)),
+        ),
+        # Яд пробивает каменную кожу с 12-го хода: ранней ничьей нет
+        'яд': (
+            character_stats(
+                strength=1,
+                agility=1,
+                endurance=1,
+                rogue_level=3,
+                warrior_level=0,
+                weapon_damage=2,
+                weapon_type='piercing',
+            ),
+            monster_stats(weapon_damage=0, strength=0, endurance=13, abilities=('stone_skin',)),
+        ),
+    }
+
+    def engine_results(self, character, monster, seed):
+        rng = random.Random(seed)
+        outcomes, turns = [], []
+        for _ in range(self.fights):
+            engine = BattleEngine(character, monster, record=RECORD_NONE, rng=rng, max_turns=50)
+            outcomes.append(engine.fight()['winner'])
+            turns.append(engine.turn_counter)
+        return np.array(outcomes), np.array(turns)
+
+    def assertClose(self, engine, simulator, spread):
+        # Четыре стандартные ошибки разности средних
+        tolerance = 4 * spread * np.sqrt(2 / self.fights) + 1e-9
+        self.assertLessEqual(abs(engine - simulator), tolerance)
+
+    def test_matches_engine(self):
+        for seed, (name, (character, monster)) in enumerate(self.matchups.items()):
+            with self.subTest(name):
+                outcomes, turns = self.engine_results(character, monster, seed)
+                vectors = {
+                    field: np.repeat(values, self.fights)
+                    for field, values in character_vectors([character]).items()
+                }
+                batch = simulate_batch(
+                    vectors,
+                    monster_vectors([monster]),
+                    rng=np.random.default_rng(seed),
+                    max_turns=50,
+                )
+
+                for winner, simulated in (
+                    ('character', batch['wins']),
+                    ('draw', batch['draws']),
+                ):
+                    rate = np.mean(outcomes == winner)
+                    self.assertClose(
+                        rate,
+                        simulated / self.fights,
+                        np.sqrt(max(rate * (1 - rate), 0.25 / self.fights)),
+                    )
+                self.assertClose(turns.mean(), batch['turns'].mean(), max(turns.std(), 0.5))
+
+    def test_early_draw(self):
+        character, monster = self.matchups['ранняя ничья']
+        batch = simulate_batch(
+            character_vectors([character]), monster_vectors([monster]), max_turns=50
+        )
+        self.assertEqual(batch['draws'], 1)
+        self.assertEqual(batch['turns'][0], 3)
+
+
+class BattleDrawTests(SimpleTestCase):
+    def test_turn_limit_ends_in_draw(self):
+        # Бросок 0.0 дает 1: оба промахиваются каждый ход, но урон возможен,
+        # поэтому ранней ничьей нет и бой идет до лимита
+        engine = BattleEngine(
+            character_stats(),
+            monster_stats(),
+            record=RECORD_EVENTS,
+            rng=[0.0] * 10,
+            max_turns=10,
+        )
+        self.assertFalse(engine.can_stall(10))
+        result = engine.fight()
+        self.assertEqual(result['winner'], 'draw')
+        self.assertEqual(engine.turn_counter, 10)
+        self.assertEqual(result['events'][-1], (10, ACTOR_CHARACTER, EVENT_DRAW, 0))
+        self.assertEqual(sum(event[2] == EVENT_MISS for event in result['events']), 10)
+
+    def test_turn_limit_with_hits_ends_in_draw(self):
+        # Бросок 0.99 дает максимум: каждая атака попадает, но здоровья хватает на все ходы
+        engine = BattleEngine(
+            character_stats(current_health=1000),
+            monster_stats(health=1000),
+            record=RECORD_EVENTS,
+            rng=[0.99] * 10,
+            max_turns=10,
+        )
+        self.assertFalse(engine.can_stall(10))
+        result = engine.fight()
+        self.assertEqual(result['winner'], 'draw')
+        self.assertEqual(engine.turn_counter, 10)
+        self.assertEqual(sum(event[2] == EVENT_HIT for event in result['events']), 10)
+
+    def test_stalled_battle_stops_after_last_damaging_turn(self):
+        # Урон возможен только в первые ходы (ярость), дальше его поглощает защита
+        engine = BattleEngine(
+            character_stats(warrior_level=0, barbarian_level=1, weapon_damage=1, strength=0),
+            monster_stats(weapon_damage=0, strength=0, abilities=('stone_skin',), endurance=2),
+            record=RECORD_NONE,
+            max_turns=50,
+        )
+        self.assertTrue(engine.can_stall(50))
+        self.assertEqual(engine.last_turn, 3)
+        self.assertEqual(engine.fight()['winner'], 'draw')
+        self.assertLessEqual(engine.turn_counter, 3)
+
+    def test_poison_is_not_cut_short(self):
+        # Яд растет каждый ход и пробивает каменную кожу только с 12-го хода
+        engine = BattleEngine(
+            character_stats(
+                strength=1,
+                agility=1,
+                endurance=1,
+                rogue_level=3,
+                warrior_level=0,
+                weapon_damage=2,
+                weapon_type='piercing',
+            ),
+            monster_stats(weapon_damage=0, strength=0, endurance=13, abilities=('stone_skin',)),
+            record=RECORD_NONE,
+            max_turns=50,
+        )
+        self.assertFalse(engine.can_stall(50))
+        self.assertEqual(engine.last_turn, 50)
+        self.assertEqual(engine.fight()['winner'], 'character')
@@ -1,12 +1,31 @@
 from django.urls import path
 
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     path('', views.index, name='index'),
     path('api/character/create/', views.create_character, name='create_character'),
     path('api/character/status/', views.get_character, name='get_character'),
+    path('api/catalog/', views.game_catalog, name='game_catalog'),
     path('api/battle/start/', views.start_battle, name='start_battle'),
+    path('api/battle/stream/', views.stream_battle, name='stream_battle'),
+    path('api/battle/auto/', views.auto_run_battles, name='auto_run_battles'),
     path('api/character/levelup/', views.level_up_character, name='level_up_character'),
     path('api/character/weapon/', views.change_weapon, name='change_weapon'),
+    path('api/battle/history/', views.battle_history, name='battle_history'),
+    path('api/battle/history/export/', views.export_battle_history, name='export_battle_history'),
+    # Асинхронные версии для ASGI-сервера
+    path(
+        'api/async/character/create/',
+        async_views.create_character,
+        name='async_create_character',
+    ),
+    path('api/async/character/status/', async_views.get_character, name='async_get_character'),
+    path('api/async/battle/start/', async_views.start_battle, name='async_start_battle'),
+    path(
+        'api/async/character/levelup/',
+        async_views.level_up_character,
+        name='async_level_up_character',
+    ),
+    path('api/async/character/weapon/', async_views.change_weapon, name='async_change_weapon'),
 ]
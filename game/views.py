@@ -1,12 +1,43 @@
+import json
 import random
 
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, OperationalError, transaction
+from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
-from .battle_engine import BattleEngine
-from .models import Character, Weapon, Monster, GameSession, BattleLog
-from .serializers import CharacterSerializer, WeaponSerializer, MonsterSerializer
+from . import content_cache
+from .battle_events import (
+    RECORD_EVENTS,
+    RECORD_MODES,
+    RECORD_NONE,
+    RECORD_TEXT,
+    LogRenderer,
+    render_log,
+)
+from .battles import (
+    auto_run,
+    get_session_character,
+    new_battle_engine,
+    play_battle,
+    prepare_battle,
+    record_battle,
+)
+from .builds import CLASSES
+from .etags import catalog_etag, character_etag, not_modified, session_character_etag, set_etag
+from .matchups import predict
+from .models import Character, Weapon, GameSession, BattleLog
+from .payloads import character_payload, monster_payload, weapon_payload
+from .serializers import BattleLogSerializer
+
+HISTORY_PAGE_SIZE = 20
+HISTORY_MAX_PAGE_SIZE = 100
+AUTO_RUN_MAX_BATTLES = 50
 
 
 def index(request):
@@ -36,7 +67,7 @@ def create_character(request):
     # Получаем начальное оружие
     weapon_map = {'rogue': 'Кинжал', 'warrior': 'Меч', 'barbarian': 'Дубина'}
 
-    initial_weapon = Weapon.objects.get(name=weapon_map[character_class])
+    initial_weapon = content_cache.get_weapon_by_name(weapon_map[character_class])
 
     # Создаем персонажа с начальным уровнем в выбранном классе
     character = Character.objects.create(
@@ -57,10 +88,9 @@ def create_character(request):
 
     character.save()
 
-    serializer = CharacterSerializer(character)
     return Response(
         {
-            'character': serializer.data,
+            'character': character_payload(character),
             'stats': {'strength': strength, 'agility': agility, 'endurance': endurance},
         }
     )
@@ -72,13 +102,39 @@ def get_character(request):
     if not session_key:
         return Response({'error': 'No active session'}, status=400)
 
+    # Клиент с актуальной копией получает 304 после проверки одной версии
+    if 'If-None-Match' in request.headers:
+        response = not_modified(request, session_character_etag(session_key))
+        if response is not None:
+            return response
+
     try:
-        game_session = GameSession.objects.get(session_key=session_key)
-        character = Character.objects.get(game_session=game_session)
-        serializer = CharacterSerializer(character)
-        return Response(serializer.data)
-    except (GameSession.DoesNotExist, Character.DoesNotExist):
+        character = get_session_character(session_key)
+    except Character.DoesNotExist:
         return Response({'error': 'Character not found'}, status=404)
+    return set_etag(
+        Response(character_payload(character)), character_etag(character.id, character.version)
+    )
+
+
+@api_view(['GET'])
+def game_catalog(request):
+    # Все оружие и монстры; меняются только вместе с каталогом (content_cache)
+    etag = catalog_etag()
+    response = not_modified(request, etag)
+    if response is not None:
+        return response
+
+    catalog = content_cache.get_catalog()
+    return set_etag(
+        Response(
+            {
+                'weapons': [weapon_payload(weapon) for weapon in catalog['weapons']],
+                'monsters': [monster_payload(monster) for monster in catalog['monsters']],
+            }
+        ),
+        etag,
+    )
 
 
 @api_view(['POST'])
@@ -87,41 +143,195 @@ def start_battle(request):
     if not session_key:
         return Response({'error': 'No active session'}, status=400)
 
+    # Формат лога в ответе: 'text' (по умолчанию), 'events' или 'none'
+    log_mode = request.data.get('log', RECORD_TEXT)
+    if log_mode not in RECORD_MODES:
+        return Response({'error': 'Unknown log mode'}, status=400)
+
     try:
-        game_session = GameSession.objects.get(session_key=session_key)
-        character = Character.objects.get(game_session=game_session)
-
-        # Выбираем случайного монстра
-        monsters = Monster.objects.all()
-        monster = random.choice(monsters)
-
-        # Создаем экземпляр боевого движка
-        battle_engine = BattleEngine(character, monster)
-        battle_result = battle_engine.fight()
-
-        # Сохраняем лог боя
-        BattleLog.objects.create(
-            game_session=game_session,
-            battle_number=character.monsters_defeated + 1,
-            log_data=battle_result['log'],
-            winner=battle_result['winner'],
-        )
+        character, monster, battle_result, events = play_battle(session_key)
+    except Character.DoesNotExist:
+        return Response({'error': 'Character not found'}, status=404)
+    except (IntegrityError, OperationalError):
+        # Конкурирующий бой той же сессии или занятая БД: клиент может повторить запрос
+        return Response({'error': 'Battle conflict, try again'}, status=409)
 
-        if battle_result['winner'] == 'character':
-            character.monsters_defeated += 1
-            character.current_health = character.max_health  # Восстанавливаем здоровье
-            character.save()
+    # Предрасчитанный прогноз боя (если таблица построена)
+    prediction = predict(character, monster)
+
+    # Текст лога строится только если клиент его запросил
+    if log_mode == RECORD_TEXT:
+        battle_result['log'] = json.dumps(render_log(events, monster.name), ensure_ascii=False)
+    elif log_mode == RECORD_EVENTS:
+        battle_result['events'] = events
+
+    return Response(
+        {
+            'battle_result': battle_result,
+            'prediction': prediction,
+            'monster': monster_payload(monster),
+            'character': character_payload(character),
+        }
+    )
+
+
+@api_view(['POST'])
+def auto_run_battles(request):
+    # Серия боев с повышениями уровня и сменой оружия между ними за один запрос
+    session_key = request.session.session_key
+    if not session_key:
+        return Response({'error': 'No active session'}, status=400)
 
+    level_up_order = request.data.get('level_up', [])
+    if not isinstance(level_up_order, list) or any(
+        character_class not in CLASSES for character_class in level_up_order
+    ):
+        return Response({'error': f'level_up must be a list of {", ".join(CLASSES)}'}, status=400)
+
+    # bool — подкласс int, поэтому true/false отсекаются отдельно
+    max_battles = request.data.get('max_battles')
+    if max_battles is not None and (
+        not isinstance(max_battles, int)
+        or isinstance(max_battles, bool)
+        or not 1 <= max_battles <= AUTO_RUN_MAX_BATTLES
+    ):
         return Response(
+            {'error': f'max_battles must be between 1 and {AUTO_RUN_MAX_BATTLES}'}, status=400
+        )
+
+    # Только JSON true/false: bool('false') дал бы True
+    take_reward = request.data.get('take_reward', False)
+    if not isinstance(take_reward, bool):
+        return Response({'error': 'take_reward must be true or false'}, status=400)
+
+    # По умолчанию логи боев не возвращаются: клиентам-ботам нужен только итог
+    log_mode = request.data.get('log', RECORD_NONE)
+    if log_mode not in RECORD_MODES:
+        return Response({'error': 'Unknown log mode'}, status=400)
+
+    try:
+        character, outcome, battles = auto_run(
+            session_key,
+            level_up_order=level_up_order,
+            take_reward=take_reward,
+            max_battles=max_battles,
+        )
+    except Character.DoesNotExist:
+        return Response({'error': 'Character not found'}, status=404)
+    except (IntegrityError, OperationalError):
+        return Response({'error': 'Battle conflict, try again'}, status=409)
+
+    items = []
+    for monster, battle_result, events, changes in battles:
+        item = {'monster': monster.name, **battle_result, **changes}
+        if log_mode == RECORD_TEXT:
+            item['log'] = render_log(events, monster.name)
+        elif log_mode == RECORD_EVENTS:
+            item['events'] = events
+        items.append(item)
+
+    return Response(
+        {
+            'outcome': outcome,
+            'battles_played': len(battles),
+            'wins': sum(
+                battle_result['winner'] == 'character' for _, battle_result, _, _ in battles
+            ),
+            'character': character_payload(character),
+            'battles': items,
+        }
+    )
+
+
+def run_to_end(generator):
+    # Дочитывает генератор и возвращает его результат (значение StopIteration)
+    while True:
+        try:
+            next(generator)
+        except StopIteration as stop:
+            return stop.value
+
+
+def sse_event(event, data):
+    payload = json.dumps(data, ensure_ascii=False, cls=DjangoJSONEncoder)
+    return f'event: {event}\ndata: {payload}\n\n'
+
+
+@csrf_exempt
+@require_POST
+def stream_battle(request):
+    # Бой потоком server-sent events: событие start, по одному turn на ход и
+    # итоговое result (или error). Браузер читает поток через fetch(), так как
+    # EventSource умеет только GET
+    session_key = request.session.session_key
+    if not session_key:
+        return JsonResponse({'error': 'No active session'}, status=400)
+
+    try:
+        character, monster, seed, battle_state = prepare_battle(session_key)
+    except Character.DoesNotExist:
+        return JsonResponse({'error': 'Character not found'}, status=404)
+
+    battle_engine = new_battle_engine(character, monster, seed)
+    renderer = LogRenderer(monster.name)
+
+    def turn_event(events):
+        return sse_event(
+            'turn',
+            {
+                'turn': battle_engine.turn_counter,
+                'character_hp': max(0, battle_engine.character_hp),
+                'monster_hp': max(0, battle_engine.monster_hp),
+                'events': events,
+                'log': renderer.render(events),
+            },
+        )
+
+    def stream():
+        yield sse_event(
+            'start',
+            {
+                'monster': monster_payload(monster),
+                'character': character_payload(character),
+                'prediction': predict(character, monster),
+            },
+        )
+
+        turns = battle_engine.iter_fight()
+        battle_result = None
+        try:
+            while battle_result is None:
+                try:
+                    yield turn_event(next(turns))
+                except StopIteration as stop:
+                    battle_result = stop.value
+        finally:
+            # Если клиент отключился, бой все равно досчитывается и сохраняется:
+            # исход не зависит от того, дочитан ли поток
+            if battle_result is None:
+                battle_result = run_to_end(turns)
+            events = battle_result.pop('events')
+            try:
+                record_battle(character, monster, seed, battle_state, battle_result, events)
+                saved = True
+            except (Character.DoesNotExist, IntegrityError, OperationalError):
+                saved = False
+
+        if not saved:
+            yield sse_event('error', {'error': 'Battle was not saved, try again'})
+            return
+        yield sse_event(
+            'result',
             {
                 'battle_result': battle_result,
-                'monster': MonsterSerializer(monster).data,
-                'character': CharacterSerializer(character).data,
-            }
+                'character': character_payload(character),
+            },
         )
 
-    except (GameSession.DoesNotExist, Character.DoesNotExist):
-        return Response({'error': 'Character not found'}, status=404)
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx не должен буферизовать поток
+    return response
 
 
 @api_view(['POST'])
@@ -130,22 +340,22 @@ def level_up_character(request):
     character_class = request.data.get('class')
 
     try:
-        game_session = GameSession.objects.get(session_key=session_key)
-        character = Character.objects.get(game_session=game_session)
-
-        success = character.level_up_class(character_class)
+        # Проверка total_level и запись идут под блокировкой строки персонажа
+        with transaction.atomic():
+            character = get_session_character(session_key, lock=True)
+            success = character.level_up_class(character_class)
 
         if success:
             return Response(
                 {
-                    'character': CharacterSerializer(character).data,
+                    'character': character_payload(character),
                     'message': f'Уровень {character_class} повышен!',
                 }
             )
         else:
             return Response({'error': 'Максимальный уровень достигнут'}, status=400)
 
-    except (GameSession.DoesNotExist, Character.DoesNotExist):
+    except Character.DoesNotExist:
         return Response({'error': 'Character not found'}, status=404)
 
 
@@ -155,23 +365,92 @@ def change_weapon(request):
     weapon_id = request.data.get('weapon_id')
 
     try:
-        game_session = GameSession.objects.get(session_key=session_key)
-        character = Character.objects.get(game_session=game_session)
-        weapon = Weapon.objects.get(id=weapon_id)
+        character = get_session_character(session_key)
+        weapon = content_cache.get_weapon(weapon_id)
 
         old_weapon = character.current_weapon
         character.current_weapon = weapon
-        character.save()
+        character.save_changes(['current_weapon'])
 
         return Response(
             {
-                'character': CharacterSerializer(character).data,
-                'old_weapon': WeaponSerializer(old_weapon).data,
-                'new_weapon': WeaponSerializer(weapon).data,
+                'character': character_payload(character),
+                'old_weapon': weapon_payload(old_weapon),
+                'new_weapon': weapon_payload(weapon),
             }
         )
 
-    except (GameSession.DoesNotExist, Character.DoesNotExist):
+    except Character.DoesNotExist:
         return Response({'error': 'Character not found'}, status=404)
     except Weapon.DoesNotExist:
         return Response({'error': 'Weapon not found'}, status=404)
+
+
+def history_queryset(session_key, cursor=None):
+    # Keyset-пагинация по (battle_number, id) в пределах сессии
+    queryset = (
+        BattleLog.objects.filter(game_session__session_key=session_key)
+        .select_related('monster')
+        .order_by('battle_number', 'id')
+    )
+    if cursor:
+        battle_number, log_id = (int(part) for part in cursor.split('.'))
+        queryset = queryset.filter(
+            Q(battle_number__gt=battle_number) | Q(battle_number=battle_number, id__gt=log_id)
+        )
+    return queryset
+
+
+def history_item(battle_log, with_log):
+    item = BattleLogSerializer(battle_log).data
+    if with_log:
+        item['log'] = battle_log.get_log_lines()
+    return item
+
+
+@api_view(['GET'])
+def battle_history(request):
+    session_key = request.session.session_key
+    if not session_key:
+        return Response({'error': 'No active session'}, status=400)
+
+    try:
+        limit = int(request.query_params.get('limit', HISTORY_PAGE_SIZE))
+        limit = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+        logs = list(history_queryset(session_key, request.query_params.get('cursor'))[: limit + 1])
+    except ValueError:
+        return Response({'error': 'Invalid cursor or limit'}, status=400)
+
+    with_log = request.query_params.get('log') == 'text'
+    page = logs[:limit]
+    next_cursor = None
+    if len(logs) > limit:
+        next_cursor = f'{page[-1].battle_number}.{page[-1].id}'
+
+    return Response(
+        {
+            'results': [history_item(battle_log, with_log) for battle_log in page],
+            'next_cursor': next_cursor,
+        }
+    )
+
+
+def export_battle_history(request):
+    # Вся история сессии построчно в NDJSON, без загрузки в память целиком
+    session_key = request.session.session_key
+    if not session_key:
+        return JsonResponse({'error': 'No active session'}, status=400)
+
+    try:
+        queryset = history_queryset(session_key, request.GET.get('cursor'))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+
+    with_log = request.GET.get('log') == 'text'
+
+    def lines():
+        for battle_log in queryset.iterator(chunk_size=500):
+            item = history_item(battle_log, with_log)
+            yield json.dumps(item, ensure_ascii=False, cls=DjangoJSONEncoder) + '\n'
+
+    return StreamingHttpResponse(lines(), content_type='application/x-ndjson')